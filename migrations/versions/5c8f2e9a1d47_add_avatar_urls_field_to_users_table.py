@@ -0,0 +1,34 @@
+"""Add avatar_urls field to users table
+
+Revision ID: 5c8f2e9a1d47
+Revises: b3e1c7d52a90
+Create Date: 2026-10-17 13:41:09.512736
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "5c8f2e9a1d47"
+down_revision: Union[str, Sequence[str], None] = "b3e1c7d52a90"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "users",
+        sa.Column(
+            "avatar_urls", postgresql.JSONB(astext_type=sa.Text()), nullable=True
+        ),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("users", "avatar_urls")
@@ -0,0 +1,58 @@
+"""Add user_id, created_at indexes to days table
+
+Revision ID: 9d3b6f1e4a28
+Revises: e8a4d1f07b3c
+Create Date: 2026-10-17 16:20:05.847113
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "9d3b6f1e4a28"
+down_revision: Union[str, Sequence[str], None] = "e8a4d1f07b3c"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY keeps days writable during the build, but cannot run
+    # inside a transaction.
+    with op.get_context().autocommit_block():
+        op.execute(
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_days_user_id_created_at
+            ON days (user_id, created_at);
+            """
+        )
+        op.execute(
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS
+            ix_days_user_id_created_at_body_weight
+            ON days (user_id, created_at) INCLUDE (body_weight)
+            WHERE body_weight IS NOT NULL;
+            """
+        )
+        op.execute(
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS
+            ix_days_user_id_created_at_total_calories
+            ON days (user_id, created_at) INCLUDE (total_calories)
+            WHERE total_calories > 0;
+            """
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute(
+            "DROP INDEX CONCURRENTLY IF EXISTS ix_days_user_id_created_at_total_calories;"
+        )
+        op.execute(
+            "DROP INDEX CONCURRENTLY IF EXISTS ix_days_user_id_created_at_body_weight;"
+        )
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_days_user_id_created_at;")
@@ -0,0 +1,31 @@
+"""Add version field to users table
+
+Revision ID: b3e1c7d52a90
+Revises: 26e004ae4c79
+Create Date: 2026-10-17 12:04:31.218420
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b3e1c7d52a90"
+down_revision: Union[str, Sequence[str], None] = "26e004ae4c79"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "users",
+        sa.Column("version", sa.Integer(), server_default="1", nullable=False),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("users", "version")
@@ -0,0 +1,61 @@
+from collections import OrderedDict
+from uuid import UUID
+
+from auth.models import UserInfoDTO
+from cache import MemoryCacheBackend
+from models import CacheStatsDTO
+
+
+class UserInfoCache:
+    """
+    Short-lived cache of authenticated users keyed by the token subject.
+
+    A user can be cached under several subjects (username and email), so
+    invalidation goes through the subjects remembered for each user id.
+    That index is an LRU of at most max_entries users; a user dropped from
+    it has their subjects dropped from the cache as well, so every cached
+    subject can still be invalidated. The user version checked by stateless tokens is cached by user id.
+    Entries live in process memory: other workers see a change once their
+    own entry expires.
+    """
+
+    def __init__(self, ttl: int, max_entries: int) -> None:
+        self._backend = MemoryCacheBackend(ttl=ttl, max_entries=max_entries)
+        self._max_entries = max_entries
+        self._subjects: OrderedDict[UUID, set[str]] = OrderedDict()
+
+    async def get(self, subject: str) -> UserInfoDTO | None:
+        cached = await self._backend.get(subject)
+        if cached is None:
+            return None
+        return UserInfoDTO.model_validate_json(cached)
+
+    async def set(self, subject: str, user: UserInfoDTO) -> None:
+        await self._backend.set(subject, user.model_dump_json())
+        self._subjects.setdefault(user.id, set()).add(subject)
+        self._subjects.move_to_end(user.id)
+        while len(self._subjects) > self._max_entries:
+            _, subjects = self._subjects.popitem(last=False)
+            for dropped_subject in subjects:
+                await self._backend.delete(dropped_subject)
+
+    async def get_version(self, user_id: UUID) -> int | None:
+        cached = await self._backend.get(self._get_version_key(user_id))
+        if cached is None:
+            return None
+        return int(cached)
+
+    async def set_version(self, user_id: UUID, version: int) -> None:
+        await self._backend.set(self._get_version_key(user_id), str(version))
+
+    async def invalidate(self, user_id: UUID) -> None:
+        for subject in self._subjects.pop(user_id, set()):
+            await self._backend.delete(subject)
+        await self._backend.delete(self._get_version_key(user_id))
+
+    def stats(self) -> CacheStatsDTO:
+        return self._backend.stats()
+
+    @staticmethod
+    def _get_version_key(user_id: UUID) -> str:
+        return f"version:{user_id}"
@@ -13,3 +13,11 @@ class WrongEmailVerificationCodeException(ValueError):
 
 class InvalidFileExtensionException(ValueError):
     pass
+
+
+class AvatarUploadNotFoundException(ValueError):
+    pass
+
+
+class InvalidAvatarUploadException(ValueError):
+    pass
@@ -0,0 +1,82 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from passlib.context import CryptContext
+
+from auth.models import PasswordHasherStatsDTO
+
+
+class PasswordHasher:
+    """
+    Argon2 hashing and verification on a dedicated thread pool.
+
+    argon2-cffi releases the GIL while hashing, so the work runs in
+    parallel with the event loop instead of blocking it. One instance is
+    shared by the whole process.
+    """
+
+    def __init__(
+        self, workers: int, time_cost: int, memory_cost: int, parallelism: int
+    ) -> None:
+        self._context = CryptContext(
+            schemes=["argon2"],
+            deprecated="auto",
+            argon2__rounds=time_cost,
+            argon2__memory_cost=memory_cost,
+            argon2__parallelism=parallelism,
+        )
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="argon2"
+        )
+        self._stats = PasswordHasherStatsDTO()
+        # Stats are updated from the worker threads.
+        self._stats_lock = threading.Lock()
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self._context.hash, password)
+
+    async def verify_and_update(
+        self, password: str, hashed_password: str
+    ) -> tuple[bool, str | None]:
+        """
+        Return whether the password matches and, if the hash was made with
+        other cost parameters, a new hash of the password.
+        """
+        return await self._run(
+            self._context.verify_and_update, password, hashed_password
+        )
+
+    def stats(self) -> PasswordHasherStatsDTO:
+        with self._stats_lock:
+            return self._stats.model_copy()
+
+    async def _run(self, func, *args):
+        submitted_at = time.monotonic()
+        with self._stats_lock:
+            self._stats.queued += 1
+
+        def run():
+            started_at = time.monotonic()
+            with self._stats_lock:
+                self._stats.queued -= 1
+                self._stats.running += 1
+            try:
+                return func(*args)
+            finally:
+                with self._stats_lock:
+                    self._stats.running -= 1
+                    self._record(
+                        started_at - submitted_at, time.monotonic() - started_at
+                    )
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, run)
+
+    def _record(self, wait_time: float, run_time: float) -> None:
+        self._stats.calls += 1
+        self._stats.wait_time_total += wait_time
+        self._stats.wait_time_max = max(self._stats.wait_time_max, wait_time)
+        self._stats.wait_time_avg = self._stats.wait_time_total / self._stats.calls
+        self._stats.run_time_total += run_time
@@ -0,0 +1,56 @@
+import asyncio
+import hashlib
+import io
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from auth.exceptions import InvalidFileExtensionException
+
+
+class AvatarProcessor:
+    """
+    Turns an uploaded avatar into square WebP images of fixed sizes.
+
+    The image is decoded once, cropped to a centered square and scaled
+    down from the largest size to the smallest.
+    """
+
+    def __init__(self, sizes: list[int], quality: int) -> None:
+        self._sizes = sorted(set(sizes), reverse=True)
+        self._quality = quality
+
+    def get_digest(self, file: bytes) -> str:
+        """
+        Hash of the upload and the output settings, used in the object keys.
+        """
+        digest = hashlib.sha256(f"{self._sizes}:{self._quality}:".encode())
+        digest.update(file)
+        return digest.hexdigest()[:32]
+
+    async def process(self, file: bytes) -> dict[int, bytes]:
+        return await asyncio.to_thread(self._process, file)
+
+    def _process(self, file: bytes) -> dict[int, bytes]:
+        largest_size = self._sizes[0]
+        try:
+            with Image.open(io.BytesIO(file)) as image:
+                # JPEG only: decode straight at a reduced scale.
+                image.draft("RGB", (largest_size, largest_size))
+                image = ImageOps.exif_transpose(image)
+                image = image.convert("RGBA" if self._has_alpha(image) else "RGB")
+                image = ImageOps.fit(image, (largest_size, largest_size))
+        except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+            raise InvalidFileExtensionException("Invalid file type")
+
+        variants = {}
+        for size in self._sizes:
+            if image.width != size:
+                image = image.resize((size, size), Image.Resampling.LANCZOS)
+            buffer = io.BytesIO()
+            image.save(buffer, format="WEBP", quality=self._quality)
+            variants[size] = buffer.getvalue()
+        return variants
+
+    @staticmethod
+    def _has_alpha(image: Image.Image) -> bool:
+        return image.mode in {"RGBA", "LA", "PA"} or "transparency" in image.info
@@ -1,5 +1,6 @@
 import re
 from datetime import datetime
+from typing import Literal
 from uuid import UUID
 
 from pydantic import BaseModel, ConfigDict, EmailStr, Field, field_validator
@@ -25,9 +26,15 @@ class UserInfoDTO(BaseModel):
     email: str
     is_verified: bool
     avatar_url: str | None = None
+    avatar_urls: dict[str, str] | None = None
     created_at: datetime
 
 
+class UserClaimsDTO(BaseModel):
+    id: UUID
+    is_verified: bool
+
+
 class UserInDBDTO(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
@@ -37,7 +44,9 @@ class UserInDBDTO(BaseModel):
     created_at: datetime | None = None
     is_verified: bool | None = None
     avatar_url: str | None = None
+    avatar_urls: dict[str, str] | None = None
     hashed_password: str | None = None
+    version: int | None = None
 
     def to_user_info(self) -> UserInfoDTO:
         return UserInfoDTO(**self.model_dump())
@@ -73,3 +82,29 @@ class UserVerificationCodeDTO(BaseModel):
 
 class RefreshTokenDTO(BaseModel):
     refresh_token: str
+
+
+class AvatarUploadRequestDTO(BaseModel):
+    content_type: Literal["image/png", "image/jpeg", "image/webp"]
+
+
+class AvatarUploadDTO(BaseModel):
+    key: str
+    url: str
+    fields: dict[str, str]
+    max_size: int
+    expires_in: int
+
+
+class AvatarUploadConfirmDTO(BaseModel):
+    key: str
+
+
+class PasswordHasherStatsDTO(BaseModel):
+    calls: int = 0
+    queued: int = 0
+    running: int = 0
+    wait_time_total: float = 0
+    wait_time_avg: float = 0
+    wait_time_max: float = 0
+    run_time_total: float = 0
@@ -3,6 +3,7 @@ from __future__ import annotations
 from typing import TYPE_CHECKING
 
 from sqlalchemy import String
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from database import Base, created_at, uuidpk
@@ -21,6 +22,8 @@ class User(Base):
     hashed_password: Mapped[str] = mapped_column(String(length=1024), nullable=False)
     is_verified: Mapped[bool] = mapped_column(default=False, nullable=False)
     avatar_url: Mapped[str | None] = mapped_column(nullable=True)
+    avatar_urls: Mapped[dict[str, str] | None] = mapped_column(JSONB, nullable=True)
+    version: Mapped[int] = mapped_column(server_default="1", nullable=False)
     created_at: Mapped[created_at]
 
     verification_code: Mapped["VerificationCode"] = relationship(
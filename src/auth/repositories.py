@@ -22,18 +22,22 @@ class UserRepository(SQLAlchemyRepository):
         return UserInfoDTO.model_validate(created_user)
 
     async def verify_user(self, user_id: UUID) -> None:
-        await self.update({"id": user_id}, is_verified=True)
+        await self.update(
+            {"id": user_id}, is_verified=True, version=self.model.version + 1
+        )
+
+    async def get_version(self, user_id: UUID) -> int | None:
+        stmt = select(self.model.version).where(self.model.id == user_id)
+        return (await self._session.execute(stmt)).scalar_one_or_none()
 
-    async def get_by_username_or_email(
-        self, username_or_email: str
-    ) -> UserInDBDTO | None:
+    async def get_by_username_or_email(self, username_or_email: str) -> UserInDBDTO:
         stmt = select(self.model).where(
             or_(
                 self.model.username == username_or_email,
                 self.model.email == username_or_email,
             )
         )
-        user = (await self._session.execute(stmt)).scalar_one_or_none()
+        user = (await self._session.execute(stmt)).scalar_one()
         return UserInDBDTO.model_validate(user)
 
     async def get_all_verified(
@@ -1,13 +1,18 @@
 from dependency_injector.wiring import inject
-from fastapi import APIRouter, BackgroundTasks, File, HTTPException, UploadFile, status
+from fastapi import APIRouter, File, HTTPException, UploadFile, status
 
 from auth.exceptions import (
     AuthenticationException,
+    AvatarUploadNotFoundException,
+    InvalidAvatarUploadException,
     InvalidFileExtensionException,
     RegistrationException,
     WrongEmailVerificationCodeException,
 )
 from auth.models import (
+    AvatarUploadConfirmDTO,
+    AvatarUploadDTO,
+    AvatarUploadRequestDTO,
     RefreshTokenDTO,
     TokenDTO,
     UserInCreateDTO,
@@ -22,6 +27,7 @@ from config.dependencies import (
     EmailNotificationDep,
     JWTAuthenticationDep,
     RegistrationDep,
+    UserProfileDep,
     UserServiceDep,
 )
 from models import ResponseDTO, SuccessDTO
@@ -64,7 +70,7 @@ async def refresh_token(
 
 @router.get("/me")
 async def get_current_user(
-    user: AuthenticatedUserDep,
+    user: UserProfileDep,
 ) -> ResponseDTO[UserInfoDTO]:
     return ResponseDTO[UserInfoDTO](data=user)
 
@@ -85,19 +91,17 @@ async def sign_up(
 @router.post("/email/verification-code", status_code=status.HTTP_200_OK)
 @inject
 async def send_email_verification_code(
-    user: AuthenticatedUserDep,
+    user: UserProfileDep,
     notification_service: EmailNotificationDep,
-    background_tasks: BackgroundTasks,
 ) -> ResponseDTO[SuccessDTO]:
     if user.is_verified:
         raise HTTPException(
             status.HTTP_400_BAD_REQUEST, detail="User is already verified"
         )
     try:
-        code = await notification_service.create_verification_code(user.id)
+        await notification_service.create_verification_code(user)
     except RegistrationException as e:
         raise HTTPException(status.HTTP_400_BAD_REQUEST, detail=str(e))
-    background_tasks.add_task(notification_service.send_verification_code, user, code)
     return ResponseDTO[SuccessDTO](data=SuccessDTO())
 
 
@@ -156,6 +160,38 @@ async def upload_avatar(
     return ResponseDTO[SuccessDTO](data=SuccessDTO())
 
 
+@router.post("/avatar/upload")
+@inject
+async def create_avatar_upload(
+    user: ActiveUserDep,
+    uploader: AvatarUploaderDep,
+    data: AvatarUploadRequestDTO,
+) -> ResponseDTO[AvatarUploadDTO]:
+    upload = await uploader.create_direct_upload(user.id, data.content_type)
+    return ResponseDTO[AvatarUploadDTO](data=upload)
+
+
+@router.post("/avatar/upload/confirm")
+@inject
+async def confirm_avatar_upload(
+    user: ActiveUserDep,
+    uploader: AvatarUploaderDep,
+    data: AvatarUploadConfirmDTO,
+) -> ResponseDTO[SuccessDTO]:
+    try:
+        await uploader.confirm_direct_upload(user.id, data.key)
+    except AvatarUploadNotFoundException as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except InvalidAvatarUploadException as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except InvalidFileExtensionException:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Unsupported avatar type",
+        )
+    return ResponseDTO[SuccessDTO](data=SuccessDTO())
+
+
 @router.delete("/avatar")
 @inject
 async def delete_avatar(
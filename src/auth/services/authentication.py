@@ -1,21 +1,35 @@
 from abc import ABC, abstractmethod
 from datetime import UTC, datetime, timedelta
+from uuid import UUID
 
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from passlib.exc import UnknownHashError
 from sqlalchemy.orm.exc import NoResultFound
 
+from auth.cache import UserInfoCache
 from auth.exceptions import AuthenticationException
-from auth.models import TokenDTO, UserInDBDTO, UserInfoDTO, UserInLoginDTO
+from auth.hasher import PasswordHasher
+from auth.models import (
+    TokenDTO,
+    UserClaimsDTO,
+    UserInDBDTO,
+    UserInfoDTO,
+    UserInLoginDTO,
+)
 from config import settings
 from unitofwork import IUnitOfWork
 
 
 class IAuthenticationService(ABC):
-    def __init__(self, uow: IUnitOfWork):
+    def __init__(
+        self,
+        uow: IUnitOfWork,
+        password_hasher: PasswordHasher,
+        user_cache: UserInfoCache | None = None,
+    ):
         self._uow: IUnitOfWork = uow
-        self._pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+        self._password_hasher = password_hasher
+        self._user_cache = user_cache
 
     @abstractmethod
     async def authenticate_user(self, data: UserInLoginDTO):
@@ -25,15 +39,26 @@ class IAuthenticationService(ABC):
     async def get_current_user(self, token: str) -> UserInfoDTO:
         raise NotImplementedError
 
-    async def _verify_password(self, plain_password: str, hashed_password: str) -> None:
+    @abstractmethod
+    async def get_current_user_claims(self, token: str) -> UserClaimsDTO:
+        raise NotImplementedError
+
+    async def _verify_password(
+        self, plain_password: str, hashed_password: str
+    ) -> str | None:
+        """
+        Return a new hash when the stored one uses outdated cost parameters.
+        """
         try:
-            is_password_verified = self._pwd_context.verify(
+            result = await self._password_hasher.verify_and_update(
                 plain_password, hashed_password
             )
         except UnknownHashError:
             raise ValueError("Incorrect password")
+        is_password_verified, new_hashed_password = result
         if not is_password_verified:
             raise ValueError("Incorrect password")
+        return new_hashed_password
 
     async def _get_db_user_by_username_or_email(self, username: str) -> UserInDBDTO:
         return await self._uow.users.get_by_username_or_email(username)
@@ -44,14 +69,23 @@ class JWTAuthenticationService(IAuthenticationService):
         try:
             async with self._uow:
                 db_user = await self._get_db_user_by_username_or_email(user.username)
-            await self._verify_password(user.password, db_user.hashed_password)
+            new_hashed_password = await self._verify_password(
+                user.password, db_user.hashed_password
+            )
         except (NoResultFound, ValueError):
             raise AuthenticationException("Incorrect username or password")
+        if new_hashed_password is not None:
+            async with self._uow:
+                await self._uow.users.update(
+                    {"id": db_user.id}, hashed_password=new_hashed_password
+                )
+                await self._uow.commit()
         access_token_expires = timedelta(
             minutes=settings.jwt.access_token_expire_minutes
         )
         access_token = await self.create_access_token(
-            data={"sub": user.username}, expires_delta=access_token_expires
+            data=self._get_access_token_data(user.username, db_user),
+            expires_delta=access_token_expires,
         )
         refresh_token_expires = timedelta(days=settings.jwt.refresh_token_expire_days)
         refresh_token = await self.create_access_token(
@@ -63,12 +97,47 @@ class JWTAuthenticationService(IAuthenticationService):
         )
 
     async def get_current_user(self, token: str) -> UserInfoDTO:
+        try:
+            payload = self._decode_jwt_payload(token, is_refresh=False)
+        except JWTError:
+            raise AuthenticationException("Could not validate credentials")
+        username = payload["sub"]
+        if settings.jwt.stateless:
+            await self._check_token_version(payload)
+
+        if self._user_cache is not None:
+            cached_user = await self._user_cache.get(username)
+            if cached_user is not None:
+                return cached_user
+
         try:
             async with self._uow:
-                db_user = await self._get_db_user_by_jwt(token)
+                db_user = await self._get_db_user_by_username_or_email(username)
+        except NoResultFound:
+            raise AuthenticationException("Could not validate credentials")
+        user = db_user.to_user_info()
+
+        if self._user_cache is not None:
+            await self._user_cache.set(username, user)
+        return user
+
+    async def get_current_user_claims(self, token: str) -> UserClaimsDTO:
+        """
+        Read the user id and verification state from the token claims.
+
+        Only the user version is looked up, and it is usually cached.
+        Tokens minted without these claims fall back to get_current_user.
+        """
+        try:
+            payload = self._decode_jwt_payload(token, is_refresh=False)
         except JWTError:
             raise AuthenticationException("Could not validate credentials")
-        return db_user.to_user_info()
+        if "uid" not in payload or "v" not in payload:
+            user = await self.get_current_user(token)
+            return UserClaimsDTO(id=user.id, is_verified=user.is_verified)
+
+        await self._check_token_version(payload)
+        return UserClaimsDTO(id=payload["uid"], is_verified=payload["ver"])
 
     @staticmethod
     async def create_access_token(
@@ -86,28 +155,59 @@ class JWTAuthenticationService(IAuthenticationService):
     async def refresh_access_token(self, refresh_token: str) -> TokenDTO:
         try:
             username = self._decore_jwt(refresh_token, is_refresh=True)
-        except JWTError:
+            async with self._uow:
+                db_user = await self._get_db_user_by_username_or_email(username)
+        except (JWTError, NoResultFound):
             raise AuthenticationException("Could not validate credentials")
         access_token_expires = timedelta(
             minutes=settings.jwt.access_token_expire_minutes
         )
         access_token = await self.create_access_token(
-            data={"sub": username}, expires_delta=access_token_expires
+            data=self._get_access_token_data(username, db_user),
+            expires_delta=access_token_expires,
         )
         return TokenDTO(
             access_token=access_token, refresh_token=refresh_token, token_type="bearer"
         )
 
-    async def _get_db_user_by_jwt(self, token: str) -> UserInDBDTO:
-        username = self._decore_jwt(token, is_refresh=False)
+    async def _check_token_version(self, payload: dict) -> None:
+        """
+        Reject tokens minted before the user's version was bumped.
+        """
+        if "v" not in payload:
+            return
         try:
-            db_user = await self._get_db_user_by_username_or_email(username)
-        except NoResultFound:
-            raise JWTError
-        return db_user
+            user_id = UUID(payload["uid"])
+        except (KeyError, ValueError):
+            raise AuthenticationException("Could not validate credentials")
+
+        version = None
+        if self._user_cache is not None:
+            version = await self._user_cache.get_version(user_id)
+        if version is None:
+            async with self._uow:
+                version = await self._uow.users.get_version(user_id)
+            if version is not None and self._user_cache is not None:
+                await self._user_cache.set_version(user_id, version)
+
+        if version is None or version != payload["v"]:
+            raise AuthenticationException("Could not validate credentials")
+
+    @staticmethod
+    def _get_access_token_data(subject: str, db_user: UserInDBDTO) -> dict:
+        return {
+            "sub": subject,
+            "uid": str(db_user.id),
+            "ver": db_user.is_verified,
+            "v": db_user.version,
+        }
+
+    @classmethod
+    def _decore_jwt(cls, token: str, is_refresh: bool) -> str:
+        return cls._decode_jwt_payload(token, is_refresh)["sub"]
 
     @staticmethod
-    def _decore_jwt(token: str, is_refresh: bool) -> str:
+    def _decode_jwt_payload(token: str, is_refresh: bool) -> dict:
         payload = jwt.decode(
             token, settings.secret_key, algorithms=[settings.jwt.algorithm]
         )
@@ -115,4 +215,4 @@ class JWTAuthenticationService(IAuthenticationService):
         token_type: str = payload.get("token_type")
         if username is None or (token_type == "refresh") is not is_refresh:
             raise JWTError
-        return username
+        return payload
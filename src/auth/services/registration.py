@@ -1,17 +1,24 @@
 from uuid import UUID
 
-from passlib.context import CryptContext
 from sqlalchemy.exc import IntegrityError
 
+from auth.cache import UserInfoCache
 from auth.exceptions import RegistrationException, WrongEmailVerificationCodeException
+from auth.hasher import PasswordHasher
 from auth.models import UserInCreateDTO, UserInfoDTO
 from unitofwork import IUnitOfWork
 
 
 class RegistrationService:
-    def __init__(self, uow: IUnitOfWork):
+    def __init__(
+        self,
+        uow: IUnitOfWork,
+        password_hasher: PasswordHasher,
+        user_cache: UserInfoCache | None = None,
+    ):
         self._uow: IUnitOfWork = uow
-        self._pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+        self._password_hasher = password_hasher
+        self._user_cache = user_cache
 
     async def register_user(self, user: UserInCreateDTO) -> UserInfoDTO:
         hashed_password = await self._hash_password(user.password)
@@ -41,6 +48,8 @@ class RegistrationService:
             await self._uow.users.verify_user(user_id)
             await self._uow.verification_codes.remove(id=verification_code.id)
             await self._uow.commit()
+        if self._user_cache is not None:
+            await self._user_cache.invalidate(user_id)
 
     async def _create_user(
         self, username: str, email: str, password: str
@@ -50,4 +59,4 @@ class RegistrationService:
         )
 
     async def _hash_password(self, plain_password: str) -> str:
-        return self._pwd_context.hash(plain_password)
+        return await self._password_hasher.hash(plain_password)
@@ -1,54 +1,196 @@
+import asyncio
+import uuid
 from uuid import UUID
 
 import filetype
 
-from auth.exceptions import InvalidFileExtensionException
+from auth.cache import UserInfoCache
+from auth.exceptions import (
+    AvatarUploadNotFoundException,
+    InvalidAvatarUploadException,
+    InvalidFileExtensionException,
+)
+from auth.image import AvatarProcessor
+from auth.models import AvatarUploadDTO
 from clients.s3 import S3Client
 from config import settings
 from unitofwork import IUnitOfWork
 
+AVATAR_CONTENT_TYPES = {"image/png", "image/jpeg", "image/webp"}
+# Direct uploads share one prefix, so a single lifecycle rule expires them.
+UPLOADS_PREFIX = "uploads"
+UPLOADS_EXPIRATION_RULE_ID = "expire-avatar-uploads"
+
 
 class AvatarUploader:
-    def __init__(self, uow: IUnitOfWork, s3_client: S3Client):
+    def __init__(
+        self,
+        uow: IUnitOfWork,
+        s3_client: S3Client,
+        avatar_processor: AvatarProcessor,
+        user_cache: UserInfoCache | None = None,
+    ):
         self._uow = uow
         self._s3_client = s3_client
+        self._avatar_processor = avatar_processor
+        self._user_cache = user_cache
 
-    async def upload(self, user_id: UUID, file: bytes) -> str:
-        key = f"{user_id}.{self._get_file_extension(file)}"
+    async def upload(self, user_id: UUID, file: bytes) -> dict[str, str]:
+        """
+        Store the avatar variants under content-hash keys.
 
-        if await self._avatar_exists(user_id):
-            self._delete(bucket=settings.s3.avatar_bucket, key=key)
+        Uploading the same image again changes nothing. Old variants are
+        removed only after the user row points to the new ones.
+        """
+        key_prefix = f"{user_id}/{self._avatar_processor.get_digest(file)}"
+        async with self._uow:
+            user = await self._uow.users.get(id=user_id)
+        if user.avatar_urls and all(
+            self._get_key(url).startswith(f"{key_prefix}/")
+            for url in user.avatar_urls.values()
+        ):
+            return user.avatar_urls
 
-        url = self._s3_client.upload_avatar(
-            file=file, bucket=settings.s3.avatar_bucket, key=key
+        variants = await self._avatar_processor.process(file)
+        urls = await asyncio.gather(
+            *[
+                self._s3_client.upload_avatar(
+                    file=variant,
+                    bucket=settings.s3.avatar_bucket,
+                    key=f"{key_prefix}/{size}.webp",
+                    content_type="image/webp",
+                )
+                for size, variant in variants.items()
+            ]
         )
+        avatar_urls = {str(size): url for size, url in zip(variants, urls)}
         async with self._uow:
-            await self._uow.users.update({"id": user_id}, avatar_url=url)
+            await self._uow.users.update(
+                {"id": user_id},
+                avatar_url=avatar_urls[str(max(variants))],
+                avatar_urls=avatar_urls,
+            )
             await self._uow.commit()
+        await self._invalidate_user(user_id)
+
+        await self._delete_urls(
+            self._get_avatar_urls(user.avatar_url, user.avatar_urls)
+        )
+        return avatar_urls
+
+    async def create_direct_upload(
+        self, user_id: UUID, content_type: str
+    ) -> AvatarUploadDTO:
+        """
+        Presigned POST for uploading the avatar straight to S3.
+
+        The object is only staged: confirm_direct_upload turns it into the
+        avatar variants and deletes it. Uploads that are never confirmed are
+        removed by the rule set up with expire_direct_uploads.
+        """
+        key = f"{UPLOADS_PREFIX}/{user_id}/{uuid.uuid4().hex}"
+        presigned_post = await self._s3_client.create_presigned_post(
+            bucket=settings.s3.avatar_bucket,
+            key=key,
+            content_type=content_type,
+            max_size=settings.avatar.max_upload_bytes,
+            expires_in=settings.avatar.presigned_expires_in,
+        )
+        return AvatarUploadDTO(
+            key=key,
+            url=presigned_post["url"],
+            fields=presigned_post["fields"],
+            max_size=settings.avatar.max_upload_bytes,
+            expires_in=settings.avatar.presigned_expires_in,
+        )
+
+    async def confirm_direct_upload(self, user_id: UUID, key: str) -> dict[str, str]:
+        """
+        Check the staged upload and store its variants like upload does.
+
+        The staged object is deleted whether it is accepted or not.
+        """
+        upload_name = key.removeprefix(f"{UPLOADS_PREFIX}/{user_id}/")
+        if upload_name == key or not upload_name.isalnum():
+            raise InvalidAvatarUploadException("Invalid avatar key")
+
+        bucket = settings.s3.avatar_bucket
+        head = await self._s3_client.head(bucket=bucket, key=key)
+        if head is None:
+            raise AvatarUploadNotFoundException("Avatar upload not found")
+        try:
+            if head["ContentLength"] > settings.avatar.max_upload_bytes:
+                raise InvalidAvatarUploadException("Avatar is too large")
 
-        return url
+            file = await self._s3_client.download(bucket=bucket, key=key)
+            kind = filetype.guess(file)
+            if (
+                kind is None
+                or kind.mime not in AVATAR_CONTENT_TYPES
+                or kind.mime != head.get("ContentType")
+            ):
+                raise InvalidFileExtensionException("Invalid file type")
+            return await self.upload(user_id, file)
+        finally:
+            await self._s3_client.delete(bucket=bucket, key=key)
+
+    async def expire_direct_uploads(self) -> None:
+        await self._s3_client.put_expiration_rule(
+            bucket=settings.s3.avatar_bucket,
+            rule_id=UPLOADS_EXPIRATION_RULE_ID,
+            prefix=f"{UPLOADS_PREFIX}/",
+            days=settings.avatar.upload_expiration_days,
+        )
 
     async def delete(self, user_id: UUID) -> None:
         async with self._uow:
             user = await self._uow.users.get(id=user_id)
-            await self._uow.users.update({"id": user_id}, avatar_url=None)
+            await self._uow.users.update(
+                {"id": user_id}, avatar_url=None, avatar_urls=None
+            )
             await self._uow.commit()
-        if user.avatar_url is None:
-            return
-        key = user.avatar_url.split("/")[-1]
-        self._delete(bucket=settings.s3.avatar_bucket, key=key)
+        await self._invalidate_user(user_id)
+        await self._delete_urls(
+            self._get_avatar_urls(user.avatar_url, user.avatar_urls)
+        )
 
-    async def _avatar_exists(self, user_id: UUID) -> bool:
-        async with self._uow:
-            user = await self._uow.users.get(id=user_id)
-            return user.avatar_url is not None
+    async def _invalidate_user(self, user_id: UUID) -> None:
+        if self._user_cache is not None:
+            await self._user_cache.invalidate(user_id)
+
+    async def _delete_urls(self, urls: set[str]) -> None:
+        await asyncio.gather(
+            *[
+                self._s3_client.delete(
+                    bucket=settings.s3.avatar_bucket, key=self._get_key(url)
+                )
+                for url in urls
+            ]
+        )
 
-    def _delete(self, bucket: str, key: str) -> None:
-        self._s3_client.delete(bucket=bucket, key=key)
+    def _get_key(self, url: str) -> str:
+        return self._s3_client.get_key(bucket=settings.s3.avatar_bucket, url=url)
 
     @staticmethod
-    def _get_file_extension(file: bytes) -> str:
-        kind = filetype.guess(file)
-        if kind:
-            return kind.extension
-        raise InvalidFileExtensionException("Invalid file type")
+    def _get_avatar_urls(
+        avatar_url: str | None, avatar_urls: dict[str, str] | None
+    ) -> set[str]:
+        urls = set((avatar_urls or {}).values())
+        if avatar_url is not None:
+            urls.add(avatar_url)
+        return urls
+
+
+async def main() -> None:
+    from config.containers import Container
+
+    container = Container()
+    await container.avatar_uploader().expire_direct_uploads()
+    print(
+        f"Unconfirmed avatar uploads expire after "
+        f"{settings.avatar.upload_expiration_days} day(s)"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
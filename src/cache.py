@@ -0,0 +1,193 @@
+import asyncio
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+
+from models import CacheStatsDTO
+
+logger = logging.getLogger(__name__)
+
+
+class ICacheBackend(ABC):
+    def __init__(self, ttl: int) -> None:
+        self._ttl = ttl
+        self._stats = CacheStatsDTO()
+
+    @abstractmethod
+    async def get(self, key: str) -> str | None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def set(self, key: str, value: str) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def _count_entries(self) -> int:
+        raise NotImplementedError
+
+    def stats(self) -> CacheStatsDTO:
+        return self._stats.model_copy(update={"entries": self._count_entries()})
+
+
+class MemoryCacheBackend(ICacheBackend):
+    """
+    In-process LRU cache with a per-entry TTL.
+
+    Least recently used entries are evicted once max_entries is reached.
+    """
+
+    def __init__(self, ttl: int, max_entries: int) -> None:
+        super().__init__(ttl)
+        self._max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+
+    async def get(self, key: str) -> str | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            self._stats.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self._stats.expirations += 1
+            self._stats.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self._stats.hits += 1
+        return value
+
+    async def set(self, key: str, value: str) -> None:
+        self._entries[key] = (time.monotonic() + self._ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+            self._stats.evictions += 1
+
+    async def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def _count_entries(self) -> int:
+        return len(self._entries)
+
+
+class DiskCacheBackend(ICacheBackend):
+    """
+    File-per-entry cache stored in a local directory.
+
+    Entries older than the TTL are treated as missing. Once the directory
+    grows beyond max_bytes, the least recently used files are removed. File
+    sizes and their order of use are tracked in memory, seeded from the
+    directory at startup, so writes do not scan it. A failed write only loses
+    the entry, so callers are not affected by it.
+    """
+
+    def __init__(self, ttl: int, path: str, max_bytes: int) -> None:
+        super().__init__(ttl)
+        self._path = Path(path)
+        self._max_bytes = max_bytes
+        self._path.mkdir(parents=True, exist_ok=True)
+        # File name -> size, least recently used first. Guarded by _lock, as
+        # reads and writes run in worker threads.
+        self._sizes: OrderedDict[str, int] = OrderedDict()
+        self._total_size = 0
+        self._lock = threading.Lock()
+        self._load_sizes()
+
+    async def get(self, key: str) -> str | None:
+        value = await asyncio.to_thread(self._read, self._get_file_path(key))
+        if value is None:
+            self._stats.misses += 1
+        else:
+            self._stats.hits += 1
+        return value
+
+    async def set(self, key: str, value: str) -> None:
+        try:
+            await asyncio.to_thread(self._write, self._get_file_path(key), value)
+        except OSError:
+            logger.warning("Could not write cache entry %s", key, exc_info=True)
+
+    async def delete(self, key: str) -> None:
+        file_path = self._get_file_path(key)
+        file_path.unlink(missing_ok=True)
+        self._forget(file_path)
+
+    def _count_entries(self) -> int:
+        return len(self._sizes)
+
+    def _read(self, file_path: Path) -> str | None:
+        try:
+            modified_at = file_path.stat().st_mtime
+            if modified_at + self._ttl <= time.time():
+                file_path.unlink(missing_ok=True)
+                self._forget(file_path)
+                self._stats.expirations += 1
+                return None
+            value = file_path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            self._forget(file_path)
+            return None
+        os.utime(file_path, (time.time(), modified_at))
+        with self._lock:
+            if file_path.name in self._sizes:
+                self._sizes.move_to_end(file_path.name)
+        return value
+
+    def _write(self, file_path: Path, value: str) -> None:
+        # Every writer gets its own temporary file, so concurrent writes of the
+        # same key do not race; the last replace wins.
+        fd, tmp_name = tempfile.mkstemp(dir=self._path, suffix=".tmp")
+        tmp_path = Path(tmp_name)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as tmp_file:
+                tmp_file.write(value)
+            size = tmp_path.stat().st_size
+            tmp_path.replace(file_path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        with self._lock:
+            self._total_size += size - self._sizes.pop(file_path.name, 0)
+            self._sizes[file_path.name] = size
+            evicted = self._pop_evicted()
+        for name in evicted:
+            (self._path / name).unlink(missing_ok=True)
+            self._stats.evictions += 1
+
+    def _pop_evicted(self) -> list[str]:
+        evicted = []
+        while self._total_size > self._max_bytes and len(self._sizes) > 1:
+            name, size = self._sizes.popitem(last=False)
+            self._total_size -= size
+            evicted.append(name)
+        return evicted
+
+    def _forget(self, file_path: Path) -> None:
+        with self._lock:
+            self._total_size -= self._sizes.pop(file_path.name, 0)
+
+    def _load_sizes(self) -> None:
+        files = []
+        for file_path in self._path.glob("*.cache"):
+            try:
+                stat = file_path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_atime, file_path.name, stat.st_size))
+        for _, name, size in sorted(files):
+            self._sizes[name] = size
+            self._total_size += size
+
+    def _get_file_path(self, key: str) -> Path:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return self._path / f"{digest}.cache"
@@ -0,0 +1,6 @@
+class IngestionJobNotFoundException(ValueError):
+    pass
+
+
+class IngestionQueueFullException(ValueError):
+    pass
@@ -0,0 +1,181 @@
+"""
+Checks that the planner serves the per-user days queries from their indexes.
+
+Every DayRepository read is run for the user with the most days, and each
+statement it sends is explained with sequential scans disabled, so the check
+also works on a small database. Run it after migrating:
+
+    python -m calorie.explain
+"""
+
+import asyncio
+import sys
+from typing import Any, Awaitable, Callable
+from uuid import UUID
+
+from sqlalchemy import event, func, select, text
+from sqlalchemy.exc import MultipleResultsFound, NoResultFound
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from calorie import orm
+from calorie.models import DaysFilterDTO, DaysFilterSortByEnum, TrendTypeEnum
+from calorie.repositories import DayRepository
+from models import DateRangeDTO
+from utils import CursorPagination, Pagination
+
+DAY_INDEX = "ix_days_user_id_created_at"
+WEIGHT_TREND_INDEX = "ix_days_user_id_created_at_body_weight"
+CALORIE_TREND_INDEX = "ix_days_user_id_created_at_total_calories"
+
+
+def get_day_queries(
+    user_id: UUID, date_range: DateRangeDTO
+) -> dict[str, tuple[str, Callable[[DayRepository], Awaitable[Any]]]]:
+    """
+    Map each DayRepository read to the index it is expected to use.
+    """
+    days_filter = DaysFilterDTO(
+        start_date=date_range.start_date,
+        end_date=date_range.end_date,
+        sort_by=DaysFilterSortByEnum.MOST_RECENT,
+    )
+    return {
+        "get_full_paginated_info": (
+            DAY_INDEX,
+            lambda days: days.get_full_paginated_info(
+                user_id, Pagination(), days_filter
+            ),
+        ),
+        "get_full_info_by_cursor": (
+            DAY_INDEX,
+            lambda days: days.get_full_info_by_cursor(
+                user_id, CursorPagination(), days_filter
+            ),
+        ),
+        "get_trends(weight)": (
+            WEIGHT_TREND_INDEX,
+            lambda days: days.get_trends(user_id, date_range, [TrendTypeEnum.WEIGHT]),
+        ),
+        "get_trends(calorie)": (
+            CALORIE_TREND_INDEX,
+            lambda days: days.get_trends(user_id, date_range, [TrendTypeEnum.CALORIE]),
+        ),
+        "get_trends(weight, calorie)": (
+            DAY_INDEX,
+            lambda days: days.get_trends(
+                user_id, date_range, [TrendTypeEnum.WEIGHT, TrendTypeEnum.CALORIE]
+            ),
+        ),
+        "get_by_date": (
+            DAY_INDEX,
+            lambda days: days.get_by_date(date_range.end_date, user_id=user_id),
+        ),
+        "get_first_and_last": (
+            DAY_INDEX,
+            lambda days: days.get_first_and_last(user_id=user_id),
+        ),
+    }
+
+
+async def explain_day_queries(session: AsyncSession) -> dict[str, tuple[str, bool]]:
+    """
+    Return the days scans of every query with whether the expected index is used.
+    """
+    query = (
+        select(
+            orm.Day.user_id,
+            func.min(orm.Day.created_at),
+            func.max(orm.Day.created_at),
+        )
+        .group_by(orm.Day.user_id)
+        .order_by(func.count().desc())
+        .limit(1)
+    )
+    row = (await session.execute(query)).first()
+    if row is None:
+        raise RuntimeError("The days table is empty")
+    user_id, first_created_at, last_created_at = row
+    date_range = DateRangeDTO(
+        start_date=first_created_at.date(),
+        end_date=last_created_at.date(),
+    )
+
+    await session.execute(text("SET LOCAL enable_seqscan = off"))
+    connection = await session.connection()
+    statements: list[tuple[str, Any]] = []
+
+    def capture(_conn, _cursor, statement, parameters, _context, _executemany):
+        statements.append((statement, parameters))
+
+    results = {}
+    days = DayRepository(session)
+    for name, (index, call) in get_day_queries(user_id, date_range).items():
+        event.listen(connection.sync_connection, "before_cursor_execute", capture)
+        try:
+            await call(days)
+        except (NoResultFound, MultipleResultsFound):
+            # Only the statements matter here, not what they return.
+            pass
+        finally:
+            event.remove(connection.sync_connection, "before_cursor_execute", capture)
+
+        scans = []
+        for statement, parameters in statements:
+            if orm.Day.__tablename__ not in statement:
+                continue
+            response = await connection.exec_driver_sql(
+                f"EXPLAIN (FORMAT JSON) {statement}", parameters
+            )
+            plan = response.scalar()
+            scans += _get_scans(plan[0]["Plan"], orm.Day.__tablename__)
+        statements.clear()
+        results[name] = (", ".join(scans), f"using {index}" in " ".join(scans))
+    return results
+
+
+def _get_scans(plan: dict, relation: str) -> list[str]:
+    scans = []
+    if plan.get("Relation Name") == relation:
+        scan = plan["Node Type"]
+        # A bitmap heap scan names its indexes in the bitmap index scans below.
+        index_names = _get_index_names(plan)
+        if index_names:
+            scan += f" using {', '.join(index_names)}"
+        scans.append(scan)
+    for subplan in plan.get("Plans", []):
+        scans += _get_scans(subplan, relation)
+    return scans
+
+
+def _get_index_names(plan: dict) -> list[str]:
+    if "Index Name" in plan:
+        return [plan["Index Name"]]
+    if plan["Node Type"] != "Bitmap Heap Scan":
+        return []
+    index_names = []
+    stack = list(plan.get("Plans", []))
+    while stack:
+        subplan = stack.pop()
+        if "Index Name" in subplan:
+            index_names.append(subplan["Index Name"])
+        stack += subplan.get("Plans", [])
+    return index_names
+
+
+async def main() -> int:
+    from config.containers import Container
+
+    container = Container()
+    async with container.async_session_maker()() as session:
+        results = await explain_day_queries(session)
+    await container.db_engine().dispose()
+
+    is_ok = True
+    for name, (scans, is_index_used) in results.items():
+        is_ok = is_ok and is_index_used
+        print(f"{'ok' if is_index_used else 'FAIL':<5}{name}: {scans}")
+    return 0 if is_ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -1,6 +1,7 @@
 from datetime import date, datetime
 from decimal import Decimal
 from enum import StrEnum
+from typing import Literal
 from uuid import UUID
 
 from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
@@ -10,21 +11,61 @@ from models import DateRangeDTO
 
 class TrendTypeEnum(StrEnum):
     WEIGHT = "weight"
+    BODY_FAT = "body_fat"
     CALORIE = "calorie"
+    PROTEINS = "proteins"
+    FATS = "fats"
+    CARBS = "carbs"
+
+
+class TrendGranularityEnum(StrEnum):
+    DAY = "day"
+    WEEK = "week"
+    MONTH = "month"
+
+
+class TrendFormatEnum(StrEnum):
+    DECIMAL = "decimal"
+    FLOAT = "float"
+    FIXED = "fixed"
 
 
 class TrendFilterDTO(DateRangeDTO):
     type: TrendTypeEnum
+    granularity: TrendGranularityEnum = TrendGranularityEnum.DAY
+    format: TrendFormatEnum = TrendFormatEnum.DECIMAL
+    scale: int = Field(2, ge=0, le=6)
 
     def to_date_range(self) -> DateRangeDTO:
         return DateRangeDTO(start_date=self.start_date, end_date=self.end_date)
 
+    def get_scale(self) -> int | None:
+        return self.scale if self.format == TrendFormatEnum.FIXED else None
+
+
+class TrendSeriesFilterDTO(DateRangeDTO):
+    types: list[TrendTypeEnum] = Field(min_length=1)
+    granularity: TrendGranularityEnum = TrendGranularityEnum.DAY
+    format: TrendFormatEnum = TrendFormatEnum.DECIMAL
+    scale: int = Field(2, ge=0, le=6)
+
+    def to_date_range(self) -> DateRangeDTO:
+        return DateRangeDTO(start_date=self.start_date, end_date=self.end_date)
+
+    def get_scale(self) -> int | None:
+        return self.scale if self.format == TrendFormatEnum.FIXED else None
+
 
 class TrendItemDTO(BaseModel):
     date: date
     value: Decimal
 
 
+class TrendSeriesDTO(BaseModel):
+    dates: list[date]
+    series: dict[TrendTypeEnum, list[Decimal | None]]
+
+
 class DayInDBDTO(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
@@ -52,6 +93,7 @@ class DaysFilterSortByEnum(StrEnum):
 class DaysFilterDTO(DateRangeDTO):
     sort_by: DaysFilterSortByEnum
     page: int = 1
+    cursor: str | None = None
 
     def to_date_range(self) -> DateRangeDTO:
         return DateRangeDTO(start_date=self.start_date, end_date=self.end_date)
@@ -144,6 +186,12 @@ class OpenAIProductMatchDTO(BaseModel):
     matched_score: Decimal
 
 
+class ProductMatchDTO(BaseModel):
+    product_id: UUID
+    name: str
+    matched_score: Decimal
+
+
 class OpenAIPer100gDTO(BaseModel):
     proteins: Decimal
     fats: Decimal
@@ -170,12 +218,64 @@ class OpenAIProductCreationListResponseDTO(BaseModel):
     products: list[OpenAIProductCreationDTO]
 
 
+class ImagePreprocessingStatsDTO(BaseModel):
+    images: int = 0
+    skipped: int = 0
+    bytes_in: int = 0
+    bytes_out: int = 0
+
+
+class LLMLimiterStatsDTO(BaseModel):
+    calls: int = 0
+    coalesced: int = 0
+    in_flight: int = 0
+    queued: int = 0
+    tokens_available: float = 0
+    tokens_used: int = 0
+    wait_time_total: float = 0
+    wait_time_avg: float = 0
+    wait_time_max: float = 0
+
+
 class IngestResponseDTO(BaseModel):
     products: list[OpenAIProductMatchDTO]
     warnings: list[str]
     unparsed: list[str]
 
 
+class IngestStageEnum(StrEnum):
+    QUEUED = "queued"
+    EXTRACTING = "extracting"
+    MATCHING = "matching"
+    CREATING_PRODUCTS = "creating_products"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class IngestJobDTO(BaseModel):
+    id: UUID
+    stage: IngestStageEnum
+    result: IngestResponseDTO | None = None
+    error: str | None = None
+    created_at: datetime
+    updated_at: datetime
+
+
+class IngestStageEventDTO(BaseModel):
+    event: Literal["stage"]
+    data: dict[str, IngestStageEnum]
+
+
+class IngestItemEventDTO(BaseModel):
+    event: Literal["item"]
+    data: OpenAIProductMatchDTO
+
+
+class IngestResultEventDTO(BaseModel):
+    event: Literal["result"]
+    data: IngestResponseDTO
+
+
 class ProductCreationDTO(BaseModel):
     name: str
     proteins: Decimal
@@ -1,28 +1,219 @@
 import base64
+import hashlib
 import json
-from typing import Any
+from typing import Any, AsyncIterator, Awaitable, Callable, TypeVar
 
-from openai import OpenAI
+from openai import AsyncOpenAI
+from pydantic import BaseModel
 
+from cache import ICacheBackend
 from calorie.models import (
+    OpenAIProductCreationDTO,
     OpenAIProductCreationListResponseDTO,
+    OpenAIProductDTO,
     OpenAIProductListResponseDTO,
 )
+from calorie.openai_client.image import ImagePreprocessor
+from calorie.openai_client.limiter import LLMLimiter
 from calorie.openai_client.openai_schemas import (
     ITEMS_SCHEMA,
+    PROMPT_VERSION,
     UNKNOWN_TO_NUTRITION_SCHEMA,
 )
+from calorie.openai_client.stream import JSONArrayItemsParser
+
+M = TypeVar("M", bound=BaseModel)
 
 
 class CalorieOpenAIClient:
-    def __init__(self, client: OpenAI):
+    def __init__(
+        self,
+        client: AsyncOpenAI,
+        limiter: LLMLimiter,
+        cache: ICacheBackend | None = None,
+        image_preprocessor: ImagePreprocessor | None = None,
+    ):
         self._client = client
+        self._limiter = limiter
+        self._cache = cache
+        self._image_preprocessor = image_preprocessor
+
+    async def image_to_items(
+        self, image_bytes: bytes, mime: str, model: str
+    ) -> OpenAIProductListResponseDTO:
+        cache_key = self._get_image_cache_key(image_bytes, model)
+        cached = await self._get_cached(cache_key, OpenAIProductListResponseDTO)
+        if cached is not None:
+            return cached
+
+        result = await self._limiter.single_flight(
+            cache_key, lambda: self._image_to_items(image_bytes, mime, model)
+        )
+        await self._set_cached(cache_key, result)
+        return result
+
+    async def user_text_to_items(
+        self, user_text: str, model: str
+    ) -> OpenAIProductListResponseDTO:
+        cache_key = self._get_user_text_cache_key(user_text, model)
+        cached = await self._get_cached(cache_key, OpenAIProductListResponseDTO)
+        if cached is not None:
+            return cached
+
+        result = await self._limiter.single_flight(
+            cache_key, lambda: self._user_text_to_items(user_text, model)
+        )
+        await self._set_cached(cache_key, result)
+        return result
+
+    async def stream_image_to_items(
+        self, image_bytes: bytes, mime: str, model: str
+    ) -> AsyncIterator[OpenAIProductDTO | OpenAIProductListResponseDTO]:
+        """
+        Yield items as soon as the model has finished writing each of them,
+        followed by the complete response.
+        """
+        cache_key = self._get_image_cache_key(image_bytes, model)
+        async for chunk in self._stream_items(
+            cache_key,
+            model,
+            lambda: self._get_image_input(image_bytes, mime),
+            "image_to_items",
+        ):
+            yield chunk
+
+    async def stream_user_text_to_items(
+        self, user_text: str, model: str
+    ) -> AsyncIterator[OpenAIProductDTO | OpenAIProductListResponseDTO]:
+        """
+        Yield items as soon as the model has finished writing each of them,
+        followed by the complete response.
+        """
+        cache_key = self._get_user_text_cache_key(user_text, model)
 
-    def image_to_items(
+        async def get_input() -> list[dict[str, Any]]:
+            return self._get_user_text_input(user_text)
+
+        async for chunk in self._stream_items(
+            cache_key, model, get_input, "text_to_items"
+        ):
+            yield chunk
+
+    async def unknown_to_nutrition(
+        self, raw_names: set[str], model: str
+    ) -> OpenAIProductCreationListResponseDTO:
+        cache_keys = {
+            raw_name: self._get_cache_key(
+                "unknown_to_nutrition",
+                model,
+                UNKNOWN_TO_NUTRITION_SCHEMA,
+                raw_name.encode(),
+            )
+            for raw_name in raw_names
+        }
+        products = []
+        missing_raw_names = set()
+        for raw_name, cache_key in cache_keys.items():
+            cached = await self._get_cached(cache_key, OpenAIProductCreationDTO)
+            if cached is None:
+                missing_raw_names.add(raw_name)
+            else:
+                products.append(cached)
+
+        if missing_raw_names:
+            flight_key = self._get_cache_key(
+                "unknown_to_nutrition",
+                model,
+                UNKNOWN_TO_NUTRITION_SCHEMA,
+                "\n".join(sorted(missing_raw_names)).encode(),
+            )
+            result = await self._limiter.single_flight(
+                flight_key,
+                lambda: self._unknown_to_nutrition(missing_raw_names, model),
+            )
+            for product in result.products:
+                if product.raw_name in missing_raw_names:
+                    await self._set_cached(cache_keys[product.raw_name], product)
+            products.extend(result.products)
+
+        return OpenAIProductCreationListResponseDTO(products=products)
+
+    async def _image_to_items(
         self, image_bytes: bytes, mime: str, model: str
     ) -> OpenAIProductListResponseDTO:
-        b64 = base64.b64encode(image_bytes).decode("utf-8")
-        data_url = f"data:{mime};base64,{b64}"
+        response = await self._create_response(
+            model=model,
+            input=await self._get_image_input(image_bytes, mime),
+            text=self._get_text_format("image_to_items", ITEMS_SCHEMA),
+        )
+        return OpenAIProductListResponseDTO.model_validate(
+            self._response_to_json(response)
+        )
+
+    async def _user_text_to_items(
+        self, user_text: str, model: str
+    ) -> OpenAIProductListResponseDTO:
+        response = await self._create_response(
+            model=model,
+            input=self._get_user_text_input(user_text),
+            text=self._get_text_format("text_to_items", ITEMS_SCHEMA),
+        )
+        return OpenAIProductListResponseDTO.model_validate(
+            self._response_to_json(response)
+        )
+
+    async def _stream_items(
+        self,
+        cache_key: str,
+        model: str,
+        get_input: Callable[[], Awaitable[list[dict[str, Any]]]],
+        name: str,
+    ) -> AsyncIterator[OpenAIProductDTO | OpenAIProductListResponseDTO]:
+        """
+        Stream the items of a request, whose input is only built on a cache miss.
+        """
+        cached = await self._get_cached(cache_key, OpenAIProductListResponseDTO)
+        if cached is not None:
+            for item in cached.items:
+                yield item
+            yield cached
+            return
+
+        input_ = await get_input()
+        parser = JSONArrayItemsParser("items")
+        output_text = []
+        async with self._limiter.limit() as call:
+            # noinspection PyTypeChecker
+            stream = await self._client.responses.create(
+                model=model,
+                input=input_,
+                text=self._get_text_format(name, ITEMS_SCHEMA),
+                stream=True,
+            )
+            async for event in stream:
+                if event.type == "response.output_text.delta":
+                    output_text.append(event.delta)
+                    for item in parser.feed(event.delta):
+                        yield OpenAIProductDTO.model_validate(item)
+                elif event.type == "response.completed":
+                    call.record_usage(event.response.usage)
+                elif event.type in {"response.failed", "response.incomplete", "error"}:
+                    raise RuntimeError(
+                        f"OpenAI response stream ended with {event.type}"
+                    )
+
+        result = OpenAIProductListResponseDTO.model_validate_json("".join(output_text))
+        await self._set_cached(cache_key, result)
+        yield result
+
+    async def _get_image_input(
+        self, image_bytes: bytes | memoryview, mime: str
+    ) -> list[dict[str, Any]]:
+        if self._image_preprocessor is not None:
+            image_bytes, mime = await self._image_preprocessor.process(
+                image_bytes, mime
+            )
+        data_url = f"data:{mime};base64,{base64.b64encode(image_bytes).decode()}"
 
         prompt = """
         You are extracting a handwritten food table.
@@ -46,34 +237,18 @@ class CalorieOpenAIClient:
         - Return JSON strictly by schema.
         """
 
-        # noinspection PyTypeChecker
-        response = self._client.responses.create(
-            model=model,
-            input=[
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "input_text", "text": prompt},
-                        {"type": "input_image", "image_url": data_url},
-                    ],
-                }
-            ],
-            text={
-                "format": {
-                    "type": "json_schema",
-                    "name": "image_to_items",
-                    "strict": True,
-                    "schema": ITEMS_SCHEMA,
-                }
-            },
-        )
-        return OpenAIProductListResponseDTO.model_validate(
-            self._response_to_json(response)
-        )
+        return [
+            {
+                "role": "user",
+                "content": [
+                    {"type": "input_text", "text": prompt},
+                    {"type": "input_image", "image_url": data_url},
+                ],
+            }
+        ]
 
-    def user_text_to_items(
-        self, user_text: str, model: str
-    ) -> OpenAIProductListResponseDTO:
+    @staticmethod
+    def _get_user_text_input(user_text: str) -> list[dict[str, Any]]:
         prompt = f"""
         Parse user's text into food items with grams.
 
@@ -105,26 +280,9 @@ class CalorieOpenAIClient:
         {user_text}
         """
 
-        # noinspection PyTypeChecker
-        response = self._client.responses.create(
-            model=model,
-            input=[
-                {"role": "user", "content": [{"type": "input_text", "text": prompt}]}
-            ],
-            text={
-                "format": {
-                    "type": "json_schema",
-                    "name": "text_to_items",
-                    "strict": True,
-                    "schema": ITEMS_SCHEMA,
-                }
-            },
-        )
-        return OpenAIProductListResponseDTO.model_validate(
-            self._response_to_json(response)
-        )
+        return [{"role": "user", "content": [{"type": "input_text", "text": prompt}]}]
 
-    def unknown_to_nutrition(
+    async def _unknown_to_nutrition(
         self, raw_names: set[str], model: str
     ) -> OpenAIProductCreationListResponseDTO:
         joined = "\n".join([f"- {x}" for x in raw_names])
@@ -142,25 +300,82 @@ class CalorieOpenAIClient:
             {joined}
         """
 
-        # noinspection PyTypeChecker
-        response = self._client.responses.create(
+        response = await self._create_response(
             model=model,
             input=[
                 {"role": "user", "content": [{"type": "input_text", "text": prompt}]}
             ],
-            text={
-                "format": {
-                    "type": "json_schema",
-                    "name": "unknown_to_nutrition",
-                    "strict": True,
-                    "schema": UNKNOWN_TO_NUTRITION_SCHEMA,
-                }
-            },
+            text=self._get_text_format(
+                "unknown_to_nutrition", UNKNOWN_TO_NUTRITION_SCHEMA
+            ),
         )
         return OpenAIProductCreationListResponseDTO.model_validate(
             self._response_to_json(response)
         )
 
+    async def _create_response(self, **kwargs: Any) -> Any:
+        async with self._limiter.limit() as call:
+            # noinspection PyTypeChecker
+            response = await self._client.responses.create(**kwargs)
+            call.record_usage(getattr(response, "usage", None))
+        return response
+
+    async def _get_cached(self, cache_key: str, model: type[M]) -> M | None:
+        if self._cache is None:
+            return None
+        cached = await self._cache.get(cache_key)
+        if cached is None:
+            return None
+        return model.model_validate_json(cached)
+
+    async def _set_cached(self, cache_key: str, value: BaseModel) -> None:
+        if self._cache is not None:
+            await self._cache.set(cache_key, value.model_dump_json())
+
+    def _get_image_cache_key(self, image_bytes: bytes, model: str) -> str:
+        preprocessing_version = (
+            self._image_preprocessor.version if self._image_preprocessor else "raw"
+        )
+        return self._get_cache_key(
+            "image_to_items",
+            model,
+            ITEMS_SCHEMA,
+            preprocessing_version.encode(),
+            image_bytes,
+        )
+
+    def _get_user_text_cache_key(self, user_text: str, model: str) -> str:
+        normalized_text = " ".join(user_text.split()).lower()
+        return self._get_cache_key(
+            "user_text_to_items", model, ITEMS_SCHEMA, normalized_text.encode()
+        )
+
+    @staticmethod
+    def _get_text_format(name: str, schema: dict[str, Any]) -> dict[str, Any]:
+        return {
+            "format": {
+                "type": "json_schema",
+                "name": name,
+                "strict": True,
+                "schema": schema,
+            }
+        }
+
+    @staticmethod
+    def _get_cache_key(
+        method: str, model: str, schema: dict[str, Any], *content: bytes
+    ) -> str:
+        schema_digest = hashlib.sha256(
+            json.dumps(schema, sort_keys=True).encode()
+        ).hexdigest()
+        content_hash = hashlib.sha256()
+        for part in content:
+            content_hash.update(part)
+        content_digest = content_hash.hexdigest()
+        return (
+            f"{method}:{PROMPT_VERSION}:{schema_digest[:16]}:{model}:{content_digest}"
+        )
+
     @staticmethod
     def _response_to_json(response) -> dict[str, Any]:
         if hasattr(response, "output_text") and response.output_text:
@@ -0,0 +1,124 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, TypeVar
+
+from calorie.models import LLMLimiterStatsDTO
+
+T = TypeVar("T")
+
+
+class LLMCall:
+    def __init__(self) -> None:
+        self.tokens: int | None = None
+
+    def record_usage(self, usage: Any) -> None:
+        total_tokens = getattr(usage, "total_tokens", None)
+        if total_tokens is not None:
+            self.tokens = total_tokens
+
+
+class LLMLimiter:
+    """
+    Process-wide limits for LLM calls.
+
+    At most max_in_flight calls run at once. Each call reserves
+    estimated_tokens from a tokens_per_minute bucket, and the reservation
+    is corrected with the usage the response reports. tokens_per_minute=0
+    disables the bucket. Identical concurrent calls can share one upstream
+    request through single_flight.
+    """
+
+    def __init__(
+        self, max_in_flight: int, tokens_per_minute: int, estimated_tokens: int
+    ) -> None:
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self._tokens_per_minute = tokens_per_minute
+        self._estimated_tokens = estimated_tokens
+        # A reservation larger than the bucket could never be granted.
+        self._reserved_tokens = min(estimated_tokens, tokens_per_minute)
+        self._tokens = float(tokens_per_minute)
+        self._refilled_at = time.monotonic()
+        self._tokens_lock = asyncio.Lock()
+        self._pending: dict[str, asyncio.Task] = {}
+        self._stats = LLMLimiterStatsDTO()
+
+    @asynccontextmanager
+    async def limit(self) -> AsyncIterator[LLMCall]:
+        started_at = time.monotonic()
+        self._stats.queued += 1
+        try:
+            await self._semaphore.acquire()
+            try:
+                await self._reserve_tokens()
+            except BaseException:
+                self._semaphore.release()
+                raise
+        finally:
+            self._stats.queued -= 1
+        self._record_wait(time.monotonic() - started_at)
+
+        call = LLMCall()
+        self._stats.in_flight += 1
+        try:
+            yield call
+        finally:
+            self._stats.in_flight -= 1
+            self._semaphore.release()
+            self._settle_tokens(call.tokens)
+
+    async def single_flight(self, key: str, call: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run call once for all concurrent callers using the same key.
+
+        The shared call keeps running if one of the callers is cancelled.
+        """
+        task = self._pending.get(key)
+        if task is None:
+            task = asyncio.ensure_future(call())
+            self._pending[key] = task
+            task.add_done_callback(lambda _: self._pending.pop(key, None))
+        else:
+            self._stats.coalesced += 1
+        return await asyncio.shield(task)
+
+    def stats(self) -> LLMLimiterStatsDTO:
+        self._refill()
+        return self._stats.model_copy(update={"tokens_available": self._tokens})
+
+    async def _reserve_tokens(self) -> None:
+        if not self._tokens_per_minute:
+            return
+        # Waiters take tokens one at a time, in arrival order.
+        async with self._tokens_lock:
+            self._refill()
+            while self._tokens < self._reserved_tokens:
+                missing_tokens = self._reserved_tokens - self._tokens
+                await asyncio.sleep(missing_tokens * 60 / self._tokens_per_minute)
+                self._refill()
+            self._tokens -= self._reserved_tokens
+
+    def _settle_tokens(self, used_tokens: int | None) -> None:
+        if used_tokens is None:
+            # Without usage the reservation stands in for the call.
+            self._stats.tokens_used += self._estimated_tokens
+            return
+        self._stats.tokens_used += used_tokens
+        if self._tokens_per_minute:
+            self._refill()
+            self._tokens = min(
+                self._tokens + self._reserved_tokens - used_tokens,
+                self._tokens_per_minute,
+            )
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        refilled = (now - self._refilled_at) * self._tokens_per_minute / 60
+        self._tokens = min(self._tokens + refilled, self._tokens_per_minute)
+        self._refilled_at = now
+
+    def _record_wait(self, wait_time: float) -> None:
+        self._stats.calls += 1
+        self._stats.wait_time_total += wait_time
+        self._stats.wait_time_max = max(self._stats.wait_time_max, wait_time)
+        self._stats.wait_time_avg = self._stats.wait_time_total / self._stats.calls
@@ -1,3 +1,6 @@
+# Bump when prompts change so cached LLM results are not reused.
+PROMPT_VERSION = 1
+
 ITEMS_SCHEMA = {
     "type": "object",
     "properties": {
@@ -0,0 +1,67 @@
+import json
+from typing import Any
+
+
+class JSONArrayItemsParser:
+    """
+    Extracts complete objects from a JSON array field while the document is
+    still being streamed.
+
+    E.g. feeding '{"items": [{"a": 1}, {"a"' returns [{"a": 1}], and feeding
+    the rest ': 2}], ...' later returns [{"a": 2}].
+    """
+
+    def __init__(self, field: str) -> None:
+        self._marker = f'"{field}"'
+        self._buffer = ""
+        self._position = 0
+        self._is_in_array = False
+        self._is_done = False
+        self._depth = 0
+        self._is_in_string = False
+        self._is_escaped = False
+        self._item_start = 0
+
+    def feed(self, chunk: str) -> list[dict[str, Any]]:
+        self._buffer += chunk
+        if self._is_done or not self._find_array_start():
+            return []
+
+        items = []
+        while self._position < len(self._buffer) and not self._is_done:
+            char = self._buffer[self._position]
+            if self._is_in_string:
+                if self._is_escaped:
+                    self._is_escaped = False
+                elif char == "\\":
+                    self._is_escaped = True
+                elif char == '"':
+                    self._is_in_string = False
+            elif char == '"':
+                self._is_in_string = True
+            elif char == "{":
+                if self._depth == 0:
+                    self._item_start = self._position
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    item = self._buffer[self._item_start : self._position + 1]
+                    items.append(json.loads(item))
+            elif char == "]" and self._depth == 0:
+                self._is_done = True
+            self._position += 1
+        return items
+
+    def _find_array_start(self) -> bool:
+        if self._is_in_array:
+            return True
+        marker_at = self._buffer.find(self._marker)
+        if marker_at == -1:
+            return False
+        array_at = self._buffer.find("[", marker_at + len(self._marker))
+        if array_at == -1:
+            return False
+        self._is_in_array = True
+        self._position = array_at + 1
+        return True
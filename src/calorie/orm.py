@@ -4,7 +4,7 @@ import uuid
 from decimal import Decimal
 from typing import TYPE_CHECKING
 
-from sqlalchemy import UUID, ForeignKey
+from sqlalchemy import UUID, ForeignKey, Index, text
 from sqlalchemy.ext.associationproxy import association_proxy
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -16,6 +16,24 @@ if TYPE_CHECKING:
 
 class Day(Base):
     __tablename__ = "days"
+    __table_args__ = (
+        Index("ix_days_user_id_created_at", "user_id", "created_at"),
+        # Covering indexes for the trend projections (index-only scans).
+        Index(
+            "ix_days_user_id_created_at_body_weight",
+            "user_id",
+            "created_at",
+            postgresql_include=["body_weight"],
+            postgresql_where=text("body_weight IS NOT NULL"),
+        ),
+        Index(
+            "ix_days_user_id_created_at_total_calories",
+            "user_id",
+            "created_at",
+            postgresql_include=["total_calories"],
+            postgresql_where=text("total_calories > 0"),
+        ),
+    )
 
     id: Mapped[uuidpk]
     body_weight: Mapped[Decimal] = mapped_column(nullable=True)
@@ -38,11 +56,13 @@ class Day(Base):
     )
 
     user: Mapped["User"] = relationship("User", back_populates="days")
+    # Loaded only through explicit loader options, see DayRepository.
     day_products: Mapped[list["DayProduct"]] = relationship(
         "DayProduct",
         back_populates="day",
         cascade="all, delete-orphan",
-        lazy="selectin",
+        passive_deletes=True,
+        lazy="raise",
     )
     products = association_proxy("day_products", "product")
 
@@ -58,11 +78,13 @@ class Product(Base):
     calories: Mapped[Decimal] = mapped_column(nullable=False)
     created_at: Mapped[created_at]
 
+    # Every day the product was ever eaten on; never needed by a product read.
     day_products: Mapped[list["DayProduct"]] = relationship(
         "DayProduct",
         back_populates="product",
         cascade="all, delete-orphan",
-        lazy="selectin",
+        passive_deletes=True,
+        lazy="raise",
     )
     days = association_proxy("day_products", "day")
 
@@ -1,11 +1,29 @@
 from datetime import date, datetime, timedelta
 from decimal import Decimal
+from typing import Iterable, Sequence
 from uuid import UUID
 
-from sqlalchemy import case, func, select
+from sqlalchemy import (
+    ARRAY,
+    BigInteger,
+    ColumnElement,
+    Float,
+    Row,
+    Select,
+    String,
+    case,
+    cast,
+    func,
+    literal,
+    or_,
+    select,
+    true,
+    tuple_,
+    update,
+)
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.exc import NoResultFound
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import InstrumentedAttribute, selectinload
 
 from calorie import orm
 from calorie.models import (
@@ -17,11 +35,14 @@ from calorie.models import (
     OpenAIProductCreationDTO,
     OpenAIProductMatchDTO,
     ProductDTO,
-    TrendItemDTO,
+    ProductMatchDTO,
+    TrendGranularityEnum,
+    TrendSeriesDTO,
+    TrendTypeEnum,
 )
 from models import DateRangeDTO
 from repository import SQLAlchemyRepository
-from utils import Pagination
+from utils import CursorPagination, Pagination
 
 
 class DayRepository(SQLAlchemyRepository):
@@ -29,46 +50,53 @@ class DayRepository(SQLAlchemyRepository):
 
     async def get_full_paginated_info(
         self, user_id: UUID, pagination: Pagination, days_filter: DaysFilterDTO
-    ) -> list[DayFullInfoDTO]:
-        query = (
-            select(self.model)
-            .options(
-                selectinload(self.model.day_products).selectinload(
-                    orm.DayProduct.product
-                )
-            )
-            .where(self.model.user_id == user_id)
+    ) -> tuple[list[DayFullInfoDTO], int]:
+        column, descending = self._get_sort_key(days_filter.sort_by)
+        query = self._get_full_info_query(user_id, days_filter)
+        query = self._order_by_sort_key(query, column, descending)
+        rows, total_count = await self._get_page_with_total_count(query, pagination)
+        return [DayFullInfoDTO.model_validate(row[0]) for row in rows], total_count
+
+    async def get_full_info_by_cursor(
+        self, user_id: UUID, pagination: CursorPagination, days_filter: DaysFilterDTO
+    ) -> tuple[list[DayFullInfoDTO], str | None]:
+        column, descending = self._get_sort_key(days_filter.sort_by)
+        query = self._get_full_info_query(user_id, days_filter)
+        query = self._paginate_by_cursor(query, pagination, column, descending)
+        response = await self._session.execute(query)
+        results, next_cursor = self._get_cursor_page(
+            pagination, response.scalars().unique().all(), column
         )
+        return [
+            DayFullInfoDTO.model_validate(result) for result in results
+        ], next_cursor
 
-        if days_filter.sort_by == DaysFilterSortByEnum.MOST_RECENT:
-            query = query.order_by(self.model.created_at.desc())
-        elif days_filter.sort_by == DaysFilterSortByEnum.OLDEST:
-            query = query.order_by(self.model.created_at.asc())
-        elif days_filter.sort_by == DaysFilterSortByEnum.LOWEST_WEIGHT:
-            query = query.order_by(self.model.body_weight.asc())
-        else:
-            query = query.order_by(self.model.total_calories.desc())
-
+    def _get_full_info_query(self, user_id: UUID, days_filter: DaysFilterDTO) -> Select:
         start_dt, end_dt_exclusive = (
             days_filter.to_date_range().format_to_exclusive_range()
         )
-        query = query.filter(self.model.created_at >= start_dt)
-        query = query.filter(self.model.created_at < end_dt_exclusive)
-
-        query = query.offset(pagination.get_offset()).limit(pagination.limit)
-        response = await self._session.execute(query)
-        results = response.scalars().unique().all()
-        return [DayFullInfoDTO.model_validate(result) for result in results]
-
-    async def count_in_date_range(self, user_id: UUID, date_range: DateRangeDTO) -> int:
-        start_dt, end_dt_exclusive = date_range.format_to_exclusive_range()
-        query = (
-            select(func.count())
+        return (
+            select(self.model)
+            .options(
+                selectinload(self.model.day_products).joinedload(
+                    orm.DayProduct.product, innerjoin=True
+                )
+            )
             .where(self.model.user_id == user_id)
             .where(self.model.created_at >= start_dt)
             .where(self.model.created_at < end_dt_exclusive)
         )
-        return (await self._session.execute(query)).scalar()
+
+    def _get_sort_key(
+        self, sort_by: DaysFilterSortByEnum
+    ) -> tuple[InstrumentedAttribute, bool]:
+        if sort_by == DaysFilterSortByEnum.MOST_RECENT:
+            return self.model.created_at, True
+        if sort_by == DaysFilterSortByEnum.OLDEST:
+            return self.model.created_at, False
+        if sort_by == DaysFilterSortByEnum.LOWEST_WEIGHT:
+            return self.model.body_weight, False
+        return self.model.total_calories, True
 
     async def get_first_and_last(
         self, /, **data: str | int | UUID
@@ -91,41 +119,106 @@ class DayRepository(SQLAlchemyRepository):
         last = response.scalar_one()
         return DayInDBDTO.model_validate(first), DayInDBDTO.model_validate(last)
 
-    async def get_weight_trend(
-        self, user_id: UUID, date_range: DateRangeDTO
-    ) -> list[TrendItemDTO]:
-        start_dt, end_dt_exclusive = date_range.format_to_exclusive_range()
-        query = (
-            select(self.model.created_at, self.model.body_weight)
-            .where(self.model.user_id == user_id)
-            .where(self.model.created_at >= start_dt)
-            .where(self.model.created_at < end_dt_exclusive)
-            .where(self.model.body_weight.isnot(None))
-            .order_by(self.model.created_at)
+    async def get_trends(
+        self,
+        user_id: UUID,
+        date_range: DateRangeDTO,
+        trend_types: list[TrendTypeEnum],
+        granularity: TrendGranularityEnum = TrendGranularityEnum.DAY,
+    ) -> TrendSeriesDTO:
+        """
+        Aggregate several trends per day, week or month in one scan.
+
+        The series share one date axis: a bucket is returned when any of them
+        has a value in it, and the others hold None there. Buckets are
+        labelled with their first date; weeks start on Monday.
+        """
+        trend_types = list(dict.fromkeys(trend_types))
+        query = self._get_trends_query(user_id, date_range, trend_types, granularity)
+        rows = (await self._session.execute(query)).all()
+        return TrendSeriesDTO(
+            dates=[row[0].date() for row in rows],
+            series={
+                type_: [row[i] for row in rows]
+                for i, type_ in enumerate(trend_types, start=1)
+            },
         )
-        days = (await self._session.execute(query)).all()
-        return [
-            TrendItemDTO(date=created_at.date(), value=body_weight)
-            for created_at, body_weight in days
-        ]
 
-    async def get_calorie_trend(
-        self, user_id: UUID, date_range: DateRangeDTO
-    ) -> list[TrendItemDTO]:
+    async def get_trend_columns(
+        self,
+        user_id: UUID,
+        date_range: DateRangeDTO,
+        trend_types: list[TrendTypeEnum],
+        granularity: TrendGranularityEnum = TrendGranularityEnum.DAY,
+        scale: int | None = None,
+    ) -> tuple[list[str], dict[TrendTypeEnum, list[float | int | None]]]:
+        """
+        Return the same trends as get_trends as plain columns ready to encode.
+
+        Postgres formats the dates and converts the values to floats, or to
+        fixed-point ints of value * 10^scale when scale is given, so the rows
+        only need to be transposed.
+        """
+        trend_types = list(dict.fromkeys(trend_types))
+        query = self._get_trends_query(user_id, date_range, trend_types, granularity)
+        bucket, *values = query.selected_columns
+        if scale is None:
+            values = [cast(value, Float) for value in values]
+        else:
+            values = [
+                cast(func.round(value * 10**scale), BigInteger) for value in values
+            ]
+        query = query.with_only_columns(func.to_char(bucket, "YYYY-MM-DD"), *values)
+        rows = (await self._session.execute(query)).all()
+        dates, *columns = list(zip(*rows)) or [()] * (len(trend_types) + 1)
+        return list(dates), {
+            type_: list(column) for type_, column in zip(trend_types, columns)
+        }
+
+    def _get_trends_query(
+        self,
+        user_id: UUID,
+        date_range: DateRangeDTO,
+        trend_types: list[TrendTypeEnum],
+        granularity: TrendGranularityEnum,
+    ) -> Select:
         start_dt, end_dt_exclusive = date_range.format_to_exclusive_range()
-        query = (
-            select(self.model)
+        bucket = func.date_trunc(granularity.value, self.model.created_at)
+        aggregates = [self._get_trend_aggregate(type_) for type_ in trend_types]
+        return (
+            select(bucket, *[value for value, _ in aggregates])
             .where(self.model.user_id == user_id)
             .where(self.model.created_at >= start_dt)
             .where(self.model.created_at < end_dt_exclusive)
-            .where(self.model.total_calories > 0)
-            .order_by(self.model.created_at)
+            .where(or_(*[condition for _, condition in aggregates]))
+            .group_by(bucket)
+            .order_by(bucket)
         )
-        days = (await self._session.execute(query)).scalars().all()
-        return [
-            TrendItemDTO(date=day.created_at.date(), value=day.total_calories)
-            for day in days
-        ]
+
+    def _get_trend_aggregate(
+        self, trend_type: TrendTypeEnum
+    ) -> tuple[ColumnElement, ColumnElement[bool]]:
+        """
+        Return the bucket value of a trend and the condition a day needs to
+        count in it.
+
+        Body measurements are averaged over the days they were taken on.
+        Calories and macros are summed over the days with food logged.
+        """
+        if trend_type == TrendTypeEnum.WEIGHT:
+            column = self.model.body_weight
+        elif trend_type == TrendTypeEnum.BODY_FAT:
+            column = self.model.body_fat
+        else:
+            column = {
+                TrendTypeEnum.CALORIE: self.model.total_calories,
+                TrendTypeEnum.PROTEINS: self.model.total_proteins,
+                TrendTypeEnum.FATS: self.model.total_fats,
+                TrendTypeEnum.CARBS: self.model.total_carbs,
+            }[trend_type]
+            condition = column > 0
+            return func.sum(column).filter(condition), condition
+        return func.round(func.avg(column), 2), column.isnot(None)
 
     async def get_by_date(self, date_: date, **data: str | int | UUID) -> DayInDBDTO:
         start = datetime.combine(date_, datetime.min.time())
@@ -139,6 +232,51 @@ class DayRepository(SQLAlchemyRepository):
         response = await self._session.execute(query)
         return DayInDBDTO.model_validate(response.scalar_one())
 
+    async def get_previous_trend(self, day: DayInDBDTO) -> Decimal | None:
+        query = (
+            select(self.model.trend)
+            .where(self.model.user_id == day.user_id)
+            .where(
+                tuple_(self.model.created_at, self.model.id) < (day.created_at, day.id)
+            )
+            .where(self.model.trend.isnot(None))
+            .order_by(self.model.created_at.desc(), self.model.id.desc())
+            .limit(1)
+        )
+        response = await self._session.execute(query)
+        return response.scalar()
+
+    async def get_weight_trend_days(
+        self, user_id: UUID, after: DayInDBDTO | None = None, limit: int | None = None
+    ) -> Sequence[Row]:
+        """
+        Return the id, body weight and trend of the days of a user in date order.
+        """
+        query = (
+            select(self.model.id, self.model.body_weight, self.model.trend)
+            .where(self.model.user_id == user_id)
+            .order_by(self.model.created_at, self.model.id)
+            .limit(limit)
+        )
+        if after is not None:
+            query = query.where(
+                tuple_(self.model.created_at, self.model.id)
+                > (after.created_at, after.id)
+            )
+        response = await self._session.execute(query)
+        return response.all()
+
+    async def update_trends(self, trends: dict[UUID, Decimal | None]) -> None:
+        await self._session.execute(
+            update(self.model),
+            [{"id": day_id, "trend": trend} for day_id, trend in trends.items()],
+        )
+
+    async def get_user_ids(self) -> list[UUID]:
+        query = select(self.model.user_id).distinct()
+        response = await self._session.execute(query)
+        return list(response.scalars())
+
     async def add(self, **insert_data) -> DayInDBDTO:
         new_model_object = self.model(**insert_data)
         self._session.add(new_model_object)
@@ -165,20 +303,9 @@ class ProductRepository(SQLAlchemyRepository):
     ) -> tuple[OpenAIProductMatchDTO, float]:
         name_lowercase = func.lower(self.model.name)
         sim = func.similarity(name_lowercase, raw_name)
-        if use_levenshtein_for_short:
-            lev = func.levenshtein(name_lowercase, raw_name)
-            lev_score = case(
-                (
-                    func.length(raw_name) <= 4,
-                    case(
-                        (lev == 0, 1.0), (lev == 1, 0.75), (lev == 2, 0.50), else_=0.0
-                    ),
-                ),
-                else_=0.0,
-            )
-            score_expression = (sim * 0.85) + (lev_score * 0.15)
-        else:
-            score_expression = sim
+        score_expression = self._get_match_score_expression(
+            raw_name, use_levenshtein_for_short
+        )
 
         score = score_expression.label("score")
         stmt = (
@@ -205,32 +332,141 @@ class ProductRepository(SQLAlchemyRepository):
         )
         return dto, score
 
-    async def add_openai_product(self, product: OpenAIProductCreationDTO) -> UUID:
-        new_model_object = self.model(
-            name=product.name_ua,
-            proteins=product.per_100g.proteins,
-            fats=product.per_100g.fats,
-            carbs=product.per_100g.carbs,
-            calories=product.per_100g.calories,
+    async def find_by_raw_names(
+        self,
+        raw_names: Iterable[str],
+        *,
+        min_similarity: float = 0.20,
+        use_levenshtein_for_short: bool = True,
+    ) -> dict[str, ProductMatchDTO]:
+        """
+        Batch version of find_by_raw_name.
+
+        Matches all raw names in one round trip and returns the best match for
+        every raw name that has one. Raw names without a match are omitted.
+        """
+        raw_names = list(dict.fromkeys(raw_names))
+        if not raw_names:
+            return {}
+
+        names = (
+            func.unnest(literal(raw_names, ARRAY(String)))
+            .table_valued("raw_name")
+            .render_derived(name="names")
         )
-        self._session.add(new_model_object)
-        await self._session.flush()
-        return new_model_object.id
+        raw_name = names.c.raw_name
+        name_lowercase = func.lower(self.model.name)
+        sim = func.similarity(name_lowercase, raw_name)
+        score = self._get_match_score_expression(
+            raw_name, use_levenshtein_for_short
+        ).label("score")
+        best_match = (
+            select(self.model.id, self.model.name, score)
+            .where(name_lowercase.op("%")(raw_name))
+            .where(sim >= min_similarity)
+            .order_by(score.desc())
+            .limit(1)
+            .lateral("best_match")
+        )
+        stmt = select(
+            raw_name, best_match.c.id, best_match.c.name, best_match.c.score
+        ).select_from(names.join(best_match, true()))
 
-    async def search_by_name(self, q: str, pagination: Pagination) -> list[ProductDTO]:
-        query = select(self.model).order_by(self.model.created_at.desc())
-        if q:
-            query = query.where(self.model.name.ilike(f"%{q}%"))
-        query = query.offset(pagination.get_offset()).limit(pagination.limit)
+        res = await self._session.execute(stmt)
+        return {
+            row.raw_name: ProductMatchDTO(
+                product_id=row.id,
+                name=row.name,
+                matched_score=Decimal(str(float(row.score))),
+            )
+            for row in res
+        }
+
+    def _get_match_score_expression(
+        self, raw_name: str | ColumnElement[str], use_levenshtein_for_short: bool
+    ) -> ColumnElement[float]:
+        name_lowercase = func.lower(self.model.name)
+        sim = func.similarity(name_lowercase, raw_name)
+        if not use_levenshtein_for_short:
+            return sim
+        lev = func.levenshtein(name_lowercase, raw_name)
+        lev_score = case(
+            (
+                func.length(raw_name) <= 4,
+                case((lev == 0, 1.0), (lev == 1, 0.75), (lev == 2, 0.50), else_=0.0),
+            ),
+            else_=0.0,
+        )
+        return (sim * 0.85) + (lev_score * 0.15)
+
+    async def bulk_add_openai_products(
+        self, products: list[OpenAIProductCreationDTO]
+    ) -> dict[str, UUID]:
+        """
+        Insert products in one statement and return their ids by name.
+
+        A name that already exists resolves to the existing product id.
+        """
+        items = {
+            product.name_ua: {
+                "name": product.name_ua,
+                "proteins": product.per_100g.proteins,
+                "fats": product.per_100g.fats,
+                "carbs": product.per_100g.carbs,
+                "calories": product.per_100g.calories,
+            }
+            for product in products
+        }
+        if not items:
+            return {}
+
+        stmt = insert(self.model).values(list(items.values()))
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[self.model.name],
+            set_={"name": stmt.excluded.name},
+        ).returning(self.model.id, self.model.name)
+
+        response = await self._session.execute(stmt)
+        return {name: product_id for product_id, name in response}
+
+    async def search_by_name(
+        self, q: str, pagination: Pagination, count_cap: int = 0
+    ) -> tuple[list[ProductDTO], int]:
+        """
+        Return a page of products and the number of matches.
+
+        With count_cap, counting stops after count_cap + 1 matches, so the
+        total never needs a full scan; a total above count_cap means "more".
+        """
+        query = self._get_search_query(q)
+        count_query = None
+        if count_cap:
+            matches = query.with_only_columns(self.model.id).limit(count_cap + 1)
+            count_query = select(func.count()).select_from(matches.subquery())
+        query = self._order_by_sort_key(query, self.model.created_at, descending=True)
+        rows, total_count = await self._get_page_with_total_count(
+            query, pagination, count_query
+        )
+        return [ProductDTO.model_validate(row[0]) for row in rows], total_count
+
+    async def search_by_name_by_cursor(
+        self, q: str, pagination: CursorPagination
+    ) -> tuple[list[ProductDTO], str | None]:
+        query = self._get_search_query(q)
+        query = self._paginate_by_cursor(
+            query, pagination, self.model.created_at, descending=True
+        )
         response = await self._session.execute(query)
-        results = response.scalars().all()
-        return [ProductDTO.model_validate(product) for product in results]
+        results, next_cursor = self._get_cursor_page(
+            pagination, response.scalars().all(), self.model.created_at
+        )
+        return [ProductDTO.model_validate(product) for product in results], next_cursor
 
-    async def count_by_name(self, q: str) -> int:
-        query = select(func.count()).select_from(self.model)
+    def _get_search_query(self, q: str) -> Select:
+        query = select(self.model)
         if q:
             query = query.where(self.model.name.ilike(f"%{q}%"))
-        return (await self._session.execute(query)).scalar()
+        return query
 
 
 class DayProductRepository(SQLAlchemyRepository):
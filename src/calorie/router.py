@@ -1,30 +1,49 @@
 from uuid import UUID
 
 from dependency_injector.wiring import inject
-from fastapi import APIRouter, File, Form, HTTPException, Query, UploadFile, status
+from fastapi import (
+    APIRouter,
+    File,
+    Form,
+    HTTPException,
+    Query,
+    Request,
+    UploadFile,
+    status,
+)
+from fastapi.responses import StreamingResponse
 
+from calorie.exceptions import (
+    IngestionJobNotFoundException,
+    IngestionQueueFullException,
+)
 from calorie.models import (
     DayCreationDTO,
     DayFullInfoDTO,
     DayMeasurementUpdateDTO,
     DaysFilterDTO,
     DaysFilterSortByEnum,
+    IngestJobDTO,
     IngestResponseDTO,
     ProductCreationDTO,
     ProductDTO,
     TrendFilterDTO,
+    TrendFormatEnum,
     TrendItemDTO,
-    TrendTypeEnum,
+    TrendSeriesDTO,
+    TrendSeriesFilterDTO,
 )
 from calorie.services.day_creation import DayCreationService
 from config.containers import Container
 from config.dependencies import (
     ActiveUserDep,
     DayServiceDep,
+    IngestionJobQueueDep,
     ProductServiceDep,
     TrendServiceDep,
 )
 from models import (
+    CursorPaginationDTO,
     DateRangeDTO,
     NameCodeDTO,
     ObjectCreationDTO,
@@ -33,7 +52,7 @@ from models import (
     ResponseDTO,
     SuccessDTO,
 )
-from utils import Pagination
+from utils import CursorPagination, Pagination, negotiate_response, to_sse_event
 
 router = APIRouter(prefix="/calorie", tags=["Calorie"])
 
@@ -41,19 +60,64 @@ router = APIRouter(prefix="/calorie", tags=["Calorie"])
 @router.get("/trend/items")
 @inject
 async def get_trend_items(
+    request: Request,
     user: ActiveUserDep,
     trend_service: TrendServiceDep,
     trend_filter: TrendFilterDTO = Query(),
 ) -> ResponseDTO[TrendItemDTO]:
-    if trend_filter.type == TrendTypeEnum.WEIGHT:
-        items = await trend_service.get_weight_trend(
-            user.id, trend_filter.to_date_range()
+    """
+    Pass format=float, or format=fixed for ints of value * 10^scale, to get
+    {"dates": [...], "values": [...]} columns instead of items.
+    Send Accept: application/msgpack to get MessagePack instead of JSON.
+    """
+    if trend_filter.format == TrendFormatEnum.DECIMAL:
+        items = await trend_service.get_trend(
+            user.id,
+            trend_filter.to_date_range(),
+            trend_filter.type,
+            trend_filter.granularity,
         )
-    else:
-        items = await trend_service.get_calorie_trend(
-            user.id, trend_filter.to_date_range()
+        return negotiate_response(request, ResponseDTO[TrendItemDTO](data=items))
+    dates, columns = await trend_service.get_trend_columns(
+        user.id,
+        trend_filter.to_date_range(),
+        [trend_filter.type],
+        trend_filter.granularity,
+        trend_filter.get_scale(),
+    )
+    data = {"dates": dates, "values": columns[trend_filter.type]}
+    return negotiate_response(request, {"data": data})
+
+
+@router.get("/trend/series")
+@inject
+async def get_trend_series(
+    request: Request,
+    user: ActiveUserDep,
+    trend_service: TrendServiceDep,
+    trend_filter: TrendSeriesFilterDTO = Query(),
+) -> ResponseDTO[TrendSeriesDTO]:
+    """
+    Pass format=float, or format=fixed for ints of value * 10^scale, to get
+    numbers instead of decimal strings.
+    Send Accept: application/msgpack to get MessagePack instead of JSON.
+    """
+    if trend_filter.format == TrendFormatEnum.DECIMAL:
+        trends = await trend_service.get_trends(
+            user.id,
+            trend_filter.to_date_range(),
+            trend_filter.types,
+            trend_filter.granularity,
         )
-    return ResponseDTO[TrendItemDTO](data=items)
+        return negotiate_response(request, ResponseDTO[TrendSeriesDTO](data=trends))
+    dates, columns = await trend_service.get_trend_columns(
+        user.id,
+        trend_filter.to_date_range(),
+        trend_filter.types,
+        trend_filter.granularity,
+        trend_filter.get_scale(),
+    )
+    return negotiate_response(request, {"data": {"dates": dates, "series": columns}})
 
 
 @router.get("/filters/date-range")
@@ -71,10 +135,20 @@ async def get_days(
     user: ActiveUserDep,
     day_service: DayServiceDep,
     days_filter: DaysFilterDTO = Query(),
-) -> ResponseDTO[PaginationDTO[DayFullInfoDTO]]:
-    pagination = Pagination(page=days_filter.page)
-    days = await day_service.get_paginated_days(user.id, pagination, days_filter)
-    return ResponseDTO[PaginationDTO[DayFullInfoDTO]](data=days)
+) -> ResponseDTO[PaginationDTO[DayFullInfoDTO] | CursorPaginationDTO[DayFullInfoDTO]]:
+    """
+    Pass cursor (empty for the first page) to page by next_cursor instead of page.
+    """
+    if days_filter.cursor is None:
+        pagination = Pagination(page=days_filter.page)
+        days = await day_service.get_paginated_days(user.id, pagination, days_filter)
+        return ResponseDTO[PaginationDTO[DayFullInfoDTO]](data=days)
+    try:
+        pagination = CursorPagination(days_filter.cursor, order=days_filter.sort_by)
+        days = await day_service.get_days_by_cursor(user.id, pagination, days_filter)
+    except ValueError as e:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return ResponseDTO[CursorPaginationDTO[DayFullInfoDTO]](data=days)
 
 
 @router.patch("/days/{day_id}")
@@ -125,16 +199,110 @@ async def ingest(
     return ResponseDTO[IngestResponseDTO](data=results)
 
 
+@router.post("/ingest/stream")
+@inject
+async def stream_ingest(
+    _: ActiveUserDep,
+    day_service: DayServiceDep,
+    image: UploadFile = File(...),
+    description: str | None = Form(None),
+) -> StreamingResponse:
+    if not image.content_type or not image.content_type.startswith("image/"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Upload an image file"
+        )
+
+    events = day_service.stream_ingestion_image(
+        image_bytes=await image.read(),
+        image_mime=image.content_type,
+        user_text=description,
+    )
+    return StreamingResponse(
+        (to_sse_event(event) async for event in events),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/ingest/jobs", status_code=status.HTTP_202_ACCEPTED)
+@inject
+async def create_ingest_job(
+    user: ActiveUserDep,
+    ingestion_job_queue: IngestionJobQueueDep,
+    image: UploadFile = File(...),
+    description: str | None = Form(None),
+) -> ResponseDTO[IngestJobDTO]:
+    if not image.content_type or not image.content_type.startswith("image/"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Upload an image file"
+        )
+
+    try:
+        job = ingestion_job_queue.submit(
+            user_id=user.id,
+            image_bytes=await image.read(),
+            image_mime=image.content_type,
+            user_text=description,
+        )
+    except IngestionQueueFullException as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e)
+        )
+    return ResponseDTO[IngestJobDTO](data=job)
+
+
+@router.get("/ingest/jobs/{job_id}")
+@inject
+async def get_ingest_job(
+    user: ActiveUserDep,
+    ingestion_job_queue: IngestionJobQueueDep,
+    job_id: UUID,
+) -> ResponseDTO[IngestJobDTO]:
+    try:
+        job = ingestion_job_queue.get(job_id, user.id)
+    except IngestionJobNotFoundException as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    return ResponseDTO[IngestJobDTO](data=job)
+
+
+@router.get("/ingest/jobs/{job_id}/events")
+@inject
+async def stream_ingest_job_events(
+    user: ActiveUserDep,
+    ingestion_job_queue: IngestionJobQueueDep,
+    job_id: UUID,
+) -> StreamingResponse:
+    try:
+        ingestion_job_queue.get(job_id, user.id)
+    except IngestionJobNotFoundException as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    return StreamingResponse(
+        ingestion_job_queue.stream_events(job_id, user.id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/products")
 @inject
 async def get_products(
     _: ActiveUserDep,
     product_service: ProductServiceDep,
     search: PaginatedSearchFilterDTO = Query(),
-) -> ResponseDTO[PaginationDTO[ProductDTO]]:
-    pagination = Pagination(page=search.page)
-    products = await product_service.search_products(search.q, pagination)
-    return ResponseDTO[PaginationDTO[ProductDTO]](data=products)
+) -> ResponseDTO[PaginationDTO[ProductDTO] | CursorPaginationDTO[ProductDTO]]:
+    """
+    Pass cursor (empty for the first page) to page by next_cursor instead of page.
+    """
+    if search.cursor is None:
+        pagination = Pagination(page=search.page)
+        products = await product_service.search_products(search.q, pagination)
+        return ResponseDTO[PaginationDTO[ProductDTO]](data=products)
+    try:
+        pagination = CursorPagination(search.cursor, order="created_at")
+        products = await product_service.search_products_by_cursor(search.q, pagination)
+    except ValueError as e:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return ResponseDTO[CursorPaginationDTO[ProductDTO]](data=products)
 
 
 @router.put("/products/{product_id}")
@@ -180,7 +348,10 @@ async def delete_product(
 @router.post("/days")
 @inject
 async def add_day(_: ActiveUserDep, data: DayCreationDTO) -> ResponseDTO[SuccessDTO]:
-    day_creation_service = DayCreationService(uow=Container.uow())
+    day_creation_service = DayCreationService(
+        uow=Container.uow(),
+        weight_trend_updater=Container.weight_trend_updater(),
+    )
     try:
         await day_creation_service.create(data)
     except ValueError as e:
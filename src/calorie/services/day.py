@@ -1,33 +1,65 @@
+import asyncio
+import logging
 from collections import defaultdict
 from decimal import Decimal
+from typing import AsyncIterator, Callable
 from uuid import UUID
 
 from sqlalchemy.exc import NoResultFound
 
 from calorie.models import (
     DayFullInfoDTO,
+    DayInDBDTO,
     DayMeasurementUpdateDTO,
     DaysFilterDTO,
+    IngestItemEventDTO,
     IngestResponseDTO,
+    IngestResultEventDTO,
+    IngestStageEnum,
     OpenAIProductCreationDTO,
     OpenAIProductDTO,
+    OpenAIProductListResponseDTO,
     OpenAIProductMatchDTO,
 )
 from calorie.openai_client.client import CalorieOpenAIClient
+from calorie.weight_trend import WeightTrendUpdater
 from config import settings
-from models import DateRangeDTO, PaginationDTO
+from models import (
+    CursorPaginationDTO,
+    DateRangeDTO,
+    ErrorEventDTO,
+    PaginationDTO,
+)
 from unitofwork import IUnitOfWork
-from utils import Pagination, this_month_range
+from utils import (
+    CursorPagination,
+    Pagination,
+    merge_async_iterators_in_batches,
+    this_month_range,
+)
+
+logger = logging.getLogger(__name__)
 
 
 class DayService:
-    def __init__(self, uow: IUnitOfWork, calorie_openai_client: CalorieOpenAIClient):
+    def __init__(
+        self,
+        uow: IUnitOfWork,
+        calorie_openai_client: CalorieOpenAIClient,
+        weight_trend_updater: WeightTrendUpdater,
+    ):
         self._uow = uow
         self._calorie_openai_client = calorie_openai_client
+        self._weight_trend_updater = weight_trend_updater
 
     async def update_day(self, day_id: UUID, data: DayMeasurementUpdateDTO) -> None:
         async with self._uow:
             await self._uow.days.update({"id": day_id}, **data.model_dump())
+            day = await self._uow.days.get(id=day_id)
+            if day is not None:
+                await self._weight_trend_updater.update(
+                    self._uow.days, DayInDBDTO.model_validate(day)
+                )
             await self._uow.commit()
 
     async def get_date_range(self, user_id: UUID) -> DateRangeDTO:
@@ -48,47 +80,130 @@ class DayService:
         self, user_id: UUID, pagination: Pagination, days_filter: DaysFilterDTO
     ) -> PaginationDTO[DayFullInfoDTO]:
         async with self._uow:
-            days = await self._uow.days.get_full_paginated_info(
+            days, count = await self._uow.days.get_full_paginated_info(
                 user_id, pagination, days_filter
             )
-            count = await self._uow.days.count_in_date_range(
-                user_id, days_filter.to_date_range()
-            )
         return PaginationDTO(
             page_count=pagination.get_page_count(count),
             total_count=count,
             data=days,
         )
 
+    async def get_days_by_cursor(
+        self, user_id: UUID, pagination: CursorPagination, days_filter: DaysFilterDTO
+    ) -> CursorPaginationDTO[DayFullInfoDTO]:
+        async with self._uow:
+            days, next_cursor = await self._uow.days.get_full_info_by_cursor(
+                user_id, pagination, days_filter
+            )
+        return CursorPaginationDTO(next_cursor=next_cursor, data=days)
+
     async def process_ingestion_image(
         self,
         image_bytes: bytes,
         image_mime: str,
         user_text: str | None,
+        on_stage: Callable[[IngestStageEnum], None] | None = None,
     ) -> IngestResponseDTO:
-        image_data = self._calorie_openai_client.image_to_items(
-            image_bytes=image_bytes,
-            mime=image_mime,
-            model=settings.openai.model_vision,
-        )
+        if on_stage is None:
+            on_stage = self._ignore_stage
 
+        on_stage(IngestStageEnum.EXTRACTING)
+        extractions = [
+            self._calorie_openai_client.image_to_items(
+                image_bytes=image_bytes,
+                mime=image_mime,
+                model=settings.openai.model_vision,
+            )
+        ]
         if user_text := (user_text or "").strip():
-            user_text_data = self._calorie_openai_client.user_text_to_items(
-                user_text=user_text,
-                model=settings.openai.model_text,
+            extractions.append(
+                self._calorie_openai_client.user_text_to_items(
+                    user_text=user_text,
+                    model=settings.openai.model_text,
+                )
             )
-            image_data.items.extend(user_text_data.items)
-            image_data.warnings += user_text_data.warnings
-            image_data.unparsed += user_text_data.unparsed
+        # Results may be shared with concurrent identical calls, so they are
+        # merged into new lists instead of being extended in place.
+        results = await asyncio.gather(*extractions)
+        items = [item for result in results for item in result.items]
 
-        resolved, unknown = await self._resolve_raw_names(image_data.items)
+        on_stage(IngestStageEnum.MATCHING)
+        resolved, unknown = await self._resolve_raw_names(items)
         if unknown:
+            on_stage(IngestStageEnum.CREATING_PRODUCTS)
             resolved.extend(await self._process_unknown_products(unknown))
 
         return IngestResponseDTO(
             products=resolved,
-            warnings=image_data.warnings,
-            unparsed=image_data.unparsed,
+            warnings=[warning for result in results for warning in result.warnings],
+            unparsed=[unparsed for result in results for unparsed in result.unparsed],
+        )
+
+    async def stream_ingestion_image(
+        self,
+        image_bytes: bytes,
+        image_mime: str,
+        user_text: str | None,
+    ) -> AsyncIterator[IngestItemEventDTO | IngestResultEventDTO | ErrorEventDTO]:
+        """
+        Match items while the model is still writing the rest of the response.
+
+        Every item is matched and sent as soon as its JSON object is complete;
+        items completed while the previous ones were being matched are
+        matched together in one query. Unknown items are collected and created in one go once all
+        extractions have finished, then the full result is sent.
+        """
+        extractions = [
+            self._calorie_openai_client.stream_image_to_items(
+                image_bytes=image_bytes,
+                mime=image_mime,
+                model=settings.openai.model_vision,
+            )
+        ]
+        if user_text := (user_text or "").strip():
+            extractions.append(
+                self._calorie_openai_client.stream_user_text_to_items(
+                    user_text=user_text,
+                    model=settings.openai.model_text,
+                )
+            )
+
+        resolved: list[OpenAIProductMatchDTO] = []
+        unknown: list[OpenAIProductDTO] = []
+        warnings: list[str] = []
+        unparsed: list[str] = []
+        try:
+            async for chunks in merge_async_iterators_in_batches(*extractions):
+                items = []
+                for chunk in chunks:
+                    if isinstance(chunk, OpenAIProductListResponseDTO):
+                        warnings += chunk.warnings
+                        unparsed += chunk.unparsed
+                    else:
+                        items.append(chunk)
+                item_resolved, item_unknown = await self._resolve_raw_names(items)
+                unknown.extend(item_unknown)
+                for match in item_resolved:
+                    resolved.append(match)
+                    yield IngestItemEventDTO(event="item", data=match)
+
+            if unknown:
+                for match in await self._process_unknown_products(unknown):
+                    resolved.append(match)
+                    yield IngestItemEventDTO(event="item", data=match)
+        except Exception:
+            logger.exception("Could not stream the ingestion of an image")
+            yield ErrorEventDTO(
+                event="error", data={"message": "Could not process the image"}
+            )
+            return
+
+        yield IngestResultEventDTO(
+            event="result",
+            data=IngestResponseDTO(
+                products=resolved, warnings=warnings, unparsed=unparsed
+            ),
         )
 
     async def _process_unknown_products(
@@ -96,10 +211,11 @@ class DayService:
     ) -> list[OpenAIProductMatchDTO]:
         unique_raw_names = self._get_unique_unknown_product_names(unknown)
 
-        products_to_create = self._calorie_openai_client.unknown_to_nutrition(
+        nutrition = await self._calorie_openai_client.unknown_to_nutrition(
             raw_names=unique_raw_names,
             model=settings.openai.model_text,
-        ).products
+        )
+        products_to_create = nutrition.products
 
         return await self._process_unknown_to_resolved(unknown, products_to_create)
 
@@ -113,27 +229,34 @@ class DayService:
             unknown_item_name = self._normalize_raw_name(unknown_item.raw_name)
             unknown_map[unknown_item_name].append(unknown_item)
 
+        products_to_create = list(
+            {
+                product_to_create.raw_name: product_to_create
+                for product_to_create in products_to_create
+                if product_to_create.raw_name in unknown_map
+            }.values()
+        )
+        if not products_to_create:
+            return []
+
+        async with self._uow:
+            product_ids = await self._uow.products.bulk_add_openai_products(
+                products_to_create
+            )
+            await self._uow.commit()
+
         resolved = []
         for product_to_create in products_to_create:
-            unknown_items = unknown_map.get(product_to_create.raw_name)
-            if not unknown_items:
-                continue
-
-            async with self._uow:
-                created_product_id = await self._uow.products.add_openai_product(
-                    product_to_create
-                )
-                await self._uow.commit()
-                for unknown_item in unknown_items:
-                    resolved.append(
-                        OpenAIProductMatchDTO(
-                            user=unknown_item.user,
-                            product_id=created_product_id,
-                            name=product_to_create.name_ua,
-                            weight=unknown_item.weight,
-                            matched_score=Decimal(0),
-                        )
+            for unknown_item in unknown_map[product_to_create.raw_name]:
+                resolved.append(
+                    OpenAIProductMatchDTO(
+                        user=unknown_item.user,
+                        product_id=product_ids[product_to_create.name_ua],
+                        name=product_to_create.name_ua,
+                        weight=unknown_item.weight,
+                        matched_score=Decimal(0),
                     )
+                )
 
         return resolved
 
@@ -142,18 +265,27 @@ class DayService:
     ) -> tuple[list[OpenAIProductMatchDTO], list[OpenAIProductDTO]]:
         resolved: list[OpenAIProductMatchDTO] = []
         unknown: list[OpenAIProductDTO] = []
+        if not items:
+            return resolved, unknown
 
-        for item in items:
-            try:
-                item_name = self._normalize_raw_name(item.raw_name)
-                async with self._uow:
-                    product, score = await self._uow.products.find_by_raw_name(
-                        item.user, item_name, item.weight
-                    )
-            except NoResultFound:
+        item_names = [self._normalize_raw_name(item.raw_name) for item in items]
+        async with self._uow:
+            matches = await self._uow.products.find_by_raw_names(item_names)
+
+        for item, item_name in zip(items, item_names):
+            match = matches.get(item_name)
+            if match is None:
                 unknown.append(item)
             else:
-                resolved.append(product)
+                resolved.append(
+                    OpenAIProductMatchDTO(
+                        user=item.user,
+                        product_id=match.product_id,
+                        name=match.name,
+                        weight=item.weight,
+                        matched_score=match.matched_score,
+                    )
+                )
 
         return resolved, unknown
 
@@ -167,6 +299,10 @@ class DayService:
                 unique_raw_names.add(unknown_item_name)
         return unique_raw_names
 
+    @staticmethod
+    def _ignore_stage(_: IngestStageEnum) -> None:
+        pass
+
     @staticmethod
     def _normalize_raw_name(raw_name: str) -> str:
         return raw_name.strip().lower()
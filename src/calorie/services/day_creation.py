@@ -11,12 +11,14 @@ from calorie.models import (
     DayProductCreationDTO,
     UserDayProductCreationDTO,
 )
+from calorie.weight_trend import WeightTrendUpdater
 from unitofwork import IUnitOfWork
 
 
 class DayCreationService:
-    def __init__(self, uow: IUnitOfWork):
+    def __init__(self, uow: IUnitOfWork, weight_trend_updater: WeightTrendUpdater):
         self._uow = uow
+        self._weight_trend_updater = weight_trend_updater
 
     async def create(self, data: DayCreationDTO) -> None:
         day_products = self._merge_products(data.products)
@@ -80,6 +82,7 @@ class DayCreationService:
                     created_at=created_at,
                     user_id=user_id,
                 )
+                await self._weight_trend_updater.update(self._uow.days, day)
                 await self._uow.day_products.bulk_add_to_day(day_products, day.id)
             else:
                 day.total_proteins += total_proteins
@@ -103,12 +106,13 @@ class DayCreationService:
                 day = None
             created_at = datetime.combine(day_date, datetime.now().time())
             if day is None:
-                await self._uow.days.add(
+                day = await self._uow.days.add(
                     total_calories=additional_calories,
                     additional_calories=additional_calories,
                     created_at=created_at,
                     user_id=user_id,
                 )
+                await self._weight_trend_updater.update(self._uow.days, day)
             else:
                 await self._uow.days.update(
                     {"id": day.id},
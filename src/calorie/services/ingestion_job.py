@@ -0,0 +1,188 @@
+import asyncio
+import contextvars
+import logging
+import uuid
+from datetime import UTC, datetime, timedelta
+from typing import AsyncIterator, Callable
+from uuid import UUID
+
+from pydantic import BaseModel
+
+from calorie.exceptions import (
+    IngestionJobNotFoundException,
+    IngestionQueueFullException,
+)
+from calorie.models import (
+    IngestJobDTO,
+    IngestResponseDTO,
+    IngestResultEventDTO,
+    IngestStageEnum,
+    IngestStageEventDTO,
+)
+from calorie.services.day import DayService
+from models import ErrorEventDTO
+from utils import to_sse_event
+
+logger = logging.getLogger(__name__)
+
+
+class IngestionJob:
+    def __init__(self, user_id: UUID) -> None:
+        self.id = uuid.uuid4()
+        self.user_id = user_id
+        self.stage = IngestStageEnum.QUEUED
+        self.result: IngestResponseDTO | None = None
+        self.error: str | None = None
+        self.created_at = self.updated_at = datetime.now(UTC)
+        self.events: list[BaseModel] = []
+        self._changed = asyncio.Event()
+        self.set_stage(IngestStageEnum.QUEUED)
+
+    @property
+    def is_finished(self) -> bool:
+        return self.stage in {IngestStageEnum.DONE, IngestStageEnum.FAILED}
+
+    def set_stage(self, stage: IngestStageEnum) -> None:
+        self.stage = stage
+        self._add_event(IngestStageEventDTO(event="stage", data={"stage": stage}))
+
+    def finish(self, result: IngestResponseDTO) -> None:
+        self.result = result
+        self._add_event(IngestResultEventDTO(event="result", data=result))
+        self.set_stage(IngestStageEnum.DONE)
+
+    def fail(self, error: str) -> None:
+        self.error = error
+        self._add_event(ErrorEventDTO(event="error", data={"message": error}))
+        self.set_stage(IngestStageEnum.FAILED)
+
+    async def wait_for_change(self, timeout: float) -> None:
+        changed = self._changed
+        try:
+            await asyncio.wait_for(changed.wait(), timeout)
+        except TimeoutError:
+            pass
+
+    def to_dto(self) -> IngestJobDTO:
+        return IngestJobDTO(
+            id=self.id,
+            stage=self.stage,
+            result=self.result,
+            error=self.error,
+            created_at=self.created_at,
+            updated_at=self.updated_at,
+        )
+
+    def _add_event(self, event: BaseModel) -> None:
+        self.updated_at = datetime.now(UTC)
+        self.events.append(event)
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+
+class IngestionJobQueue:
+    """
+    In-process queue of ingestion jobs drained by a fixed number of workers.
+
+    Jobs live in the memory of the worker process that accepted the upload
+    and are dropped once finished for longer than job_ttl seconds.
+    """
+
+    def __init__(
+        self,
+        day_service_factory: Callable[[], DayService],
+        workers: int,
+        max_queued: int,
+        job_ttl: int,
+        keep_alive_interval: float = 15.0,
+    ) -> None:
+        self._day_service_factory = day_service_factory
+        self._workers_count = workers
+        self._max_queued = max_queued
+        self._job_ttl = timedelta(seconds=job_ttl)
+        self._keep_alive_interval = keep_alive_interval
+        self._jobs: dict[UUID, IngestionJob] = {}
+        self._queue: asyncio.Queue | None = None
+        self._workers: list[asyncio.Task] = []
+
+    def submit(
+        self,
+        user_id: UUID,
+        image_bytes: bytes,
+        image_mime: str,
+        user_text: str | None,
+    ) -> IngestJobDTO:
+        self._start_workers()
+        self._remove_expired_jobs()
+        job = IngestionJob(user_id)
+        try:
+            self._queue.put_nowait((job, image_bytes, image_mime, user_text))
+        except asyncio.QueueFull:
+            raise IngestionQueueFullException("Too many images are being processed")
+        self._jobs[job.id] = job
+        return job.to_dto()
+
+    def get(self, job_id: UUID, user_id: UUID) -> IngestJobDTO:
+        return self._get_job(job_id, user_id).to_dto()
+
+    async def stream_events(self, job_id: UUID, user_id: UUID) -> AsyncIterator[str]:
+        """
+        Yield the job events formatted as Server-Sent Events.
+
+        Events already emitted are replayed first. A keep-alive comment is
+        sent while waiting so proxies do not close an idle stream.
+        """
+        job = self._get_job(job_id, user_id)
+        sent = 0
+        while True:
+            while sent < len(job.events):
+                event = job.events[sent]
+                sent += 1
+                yield to_sse_event(event)
+            if job.is_finished:
+                return
+            events_count = len(job.events)
+            await job.wait_for_change(self._keep_alive_interval)
+            if len(job.events) == events_count:
+                yield ": keep-alive\n\n"
+
+    def _get_job(self, job_id: UUID, user_id: UUID) -> IngestionJob:
+        job = self._jobs.get(job_id)
+        if job is None or job.user_id != user_id:
+            raise IngestionJobNotFoundException("Ingestion job not found")
+        return job
+
+    def _start_workers(self) -> None:
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self._max_queued)
+        if not self._workers:
+            # Workers outlive the request that starts them, so they must not
+            # inherit its context, e.g. its unit of work scope.
+            self._workers = [
+                asyncio.create_task(self._work(), context=contextvars.Context())
+                for _ in range(self._workers_count)
+            ]
+
+    async def _work(self) -> None:
+        while True:
+            job, image_bytes, image_mime, user_text = await self._queue.get()
+            try:
+                result = await self._day_service_factory().process_ingestion_image(
+                    image_bytes=image_bytes,
+                    image_mime=image_mime,
+                    user_text=user_text,
+                    on_stage=job.set_stage,
+                )
+            except Exception:
+                logger.exception("Could not process ingestion job %s", job.id)
+                job.fail("Could not process the image")
+            else:
+                job.finish(result)
+            finally:
+                self._queue.task_done()
+
+    def _remove_expired_jobs(self) -> None:
+        expired_before = datetime.now(UTC) - self._job_ttl
+        for job_id, job in list(self._jobs.items()):
+            if job.is_finished and job.updated_at < expired_before:
+                del self._jobs[job_id]
@@ -3,28 +3,43 @@ from uuid import UUID
 from sqlalchemy.exc import IntegrityError
 
 from calorie.models import ProductCreationDTO, ProductDTO
-from models import PaginationDTO
+from models import CursorPaginationDTO, PaginationDTO
 from unitofwork import IUnitOfWork
-from utils import Pagination
+from utils import CursorPagination, Pagination
 
 
 class ProductService:
-    def __init__(self, uow: IUnitOfWork):
+    def __init__(self, uow: IUnitOfWork, search_count_cap: int = 0):
         self._uow = uow
+        self._search_count_cap = search_count_cap
 
     async def search_products(
         self, q: str, pagination: Pagination
     ) -> PaginationDTO[ProductDTO]:
         async with self._uow:
-            products = await self._uow.products.search_by_name(q, pagination)
-            count = await self._uow.products.count_by_name(q)
+            products, count = await self._uow.products.search_by_name(
+                q, pagination, self._search_count_cap
+            )
 
+        is_count_capped = 0 < self._search_count_cap < count
+        if is_count_capped:
+            count = self._search_count_cap
         return PaginationDTO(
             page_count=pagination.get_page_count(count),
             total_count=count,
+            is_total_count_capped=is_count_capped,
             data=products,
         )
 
+    async def search_products_by_cursor(
+        self, q: str, pagination: CursorPagination
+    ) -> CursorPaginationDTO[ProductDTO]:
+        async with self._uow:
+            products, next_cursor = await self._uow.products.search_by_name_by_cursor(
+                q, pagination
+            )
+        return CursorPaginationDTO(next_cursor=next_cursor, data=products)
+
     async def update_product(self, product_id: UUID, data: ProductCreationDTO) -> None:
         async with self._uow:
             try:
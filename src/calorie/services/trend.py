@@ -1,6 +1,11 @@
 from uuid import UUID
 
-from calorie.models import TrendItemDTO
+from calorie.models import (
+    TrendGranularityEnum,
+    TrendItemDTO,
+    TrendSeriesDTO,
+    TrendTypeEnum,
+)
 from models import DateRangeDTO
 from unitofwork import IUnitOfWork
 
@@ -9,14 +14,40 @@ class TrendService:
     def __init__(self, uow: IUnitOfWork):
         self._uow = uow
 
-    async def get_weight_trend(
-        self, user_id: UUID, date_range: DateRangeDTO
+    async def get_trend(
+        self,
+        user_id: UUID,
+        date_range: DateRangeDTO,
+        trend_type: TrendTypeEnum,
+        granularity: TrendGranularityEnum = TrendGranularityEnum.DAY,
     ) -> list[TrendItemDTO]:
+        trends = await self.get_trends(user_id, date_range, [trend_type], granularity)
+        return [
+            TrendItemDTO(date=date_, value=value)
+            for date_, value in zip(trends.dates, trends.series[trend_type])
+        ]
+
+    async def get_trends(
+        self,
+        user_id: UUID,
+        date_range: DateRangeDTO,
+        trend_types: list[TrendTypeEnum],
+        granularity: TrendGranularityEnum = TrendGranularityEnum.DAY,
+    ) -> TrendSeriesDTO:
         async with self._uow:
-            return await self._uow.days.get_weight_trend(user_id, date_range)
+            return await self._uow.days.get_trends(
+                user_id, date_range, trend_types, granularity
+            )
 
-    async def get_calorie_trend(
-        self, user_id: UUID, date_range: DateRangeDTO
-    ) -> list[TrendItemDTO]:
+    async def get_trend_columns(
+        self,
+        user_id: UUID,
+        date_range: DateRangeDTO,
+        trend_types: list[TrendTypeEnum],
+        granularity: TrendGranularityEnum = TrendGranularityEnum.DAY,
+        scale: int | None = None,
+    ) -> tuple[list[str], dict[TrendTypeEnum, list[float | int | None]]]:
         async with self._uow:
-            return await self._uow.days.get_calorie_trend(user_id, date_range)
+            return await self._uow.days.get_trend_columns(
+                user_id, date_range, trend_types, granularity, scale
+            )
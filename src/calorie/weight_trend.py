@@ -0,0 +1,95 @@
+"""
+Maintains Day.trend, an exponentially smoothed body weight.
+
+A day with a weight moves the previous day's trend toward that weight by the
+smoothing factor, and a day without one carries the previous trend over.
+Trends are updated on write, so reads take them as stored. Run once to fill in
+the trends of the days written before they were maintained:
+
+    python -m calorie.weight_trend
+"""
+
+import asyncio
+from decimal import Decimal
+from uuid import UUID
+
+from calorie.models import DayInDBDTO
+from calorie.repositories import DayRepository
+
+TREND_QUANTUM = Decimal("0.0001")
+
+
+class WeightTrendUpdater:
+    """
+    Updates the trend of a day from the trend of the day before it.
+
+    The later days are then re-propagated until one of them keeps its trend,
+    which is the next day for a day added or edited without moving its trend.
+    A back-dated edit stops after max_propagation_days days; the trends left
+    behind are off by less as every weigh-in past the edit shrinks the error.
+    """
+
+    def __init__(self, smoothing: Decimal, max_propagation_days: int) -> None:
+        self._smoothing = smoothing
+        self._max_propagation_days = max_propagation_days
+
+    async def update(self, days: DayRepository, day: DayInDBDTO) -> None:
+        previous_trend = await days.get_previous_trend(day)
+        trend = self._get_trend(previous_trend, day.body_weight)
+        if trend == day.trend:
+            return
+
+        trends = {day.id: trend}
+        later_days = await days.get_weight_trend_days(
+            day.user_id, day, self._max_propagation_days
+        )
+        for later_day in later_days:
+            trend = self._get_trend(trend, later_day.body_weight)
+            if trend == later_day.trend:
+                break
+            trends[later_day.id] = trend
+        await days.update_trends(trends)
+
+    async def rebuild(self, days: DayRepository, user_id: UUID) -> int:
+        """
+        Recompute every trend of a user and return how many of them changed.
+        """
+        trend = None
+        trends = {}
+        for day in await days.get_weight_trend_days(user_id):
+            trend = self._get_trend(trend, day.body_weight)
+            if trend != day.trend:
+                trends[day.id] = trend
+        if trends:
+            await days.update_trends(trends)
+        return len(trends)
+
+    def _get_trend(
+        self, previous_trend: Decimal | None, body_weight: Decimal | None
+    ) -> Decimal | None:
+        if body_weight is None:
+            return previous_trend
+        if previous_trend is None:
+            return body_weight.quantize(TREND_QUANTUM)
+        trend = previous_trend + self._smoothing * (body_weight - previous_trend)
+        return trend.quantize(TREND_QUANTUM)
+
+
+async def main() -> None:
+    from config.containers import Container
+
+    container = Container()
+    updater = container.weight_trend_updater()
+    uow = container.uow()
+    async with uow:
+        user_ids = await uow.days.get_user_ids()
+    for user_id in user_ids:
+        async with uow:
+            updated = await updater.rebuild(uow.days, user_id)
+            await uow.commit()
+        print(f"{user_id}: {updated} trends updated")
+    await container.db_engine().dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
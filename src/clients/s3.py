@@ -1,12 +1,49 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
 import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
 
 
 class S3Client:
-    def __init__(self, region: str) -> None:
+    """
+    Process-wide S3 client.
+
+    boto3 clients are thread-safe, so one client and its connection pool
+    are shared, and the blocking calls run on a thread pool sized to that
+    pool. endpoint_url points the client at an S3 stand-in such as moto.
+    """
+
+    def __init__(
+        self,
+        region: str,
+        endpoint_url: str = "",
+        max_pool_connections: int = 10,
+        connect_timeout: int = 5,
+        read_timeout: int = 30,
+        max_attempts: int = 3,
+    ) -> None:
         self._region = region
-        self._client = boto3.client("s3", region_name=region)
+        self._endpoint_url = endpoint_url.rstrip("/")
+        self._client = boto3.client(
+            "s3",
+            region_name=region,
+            endpoint_url=self._endpoint_url or None,
+            config=Config(
+                max_pool_connections=max_pool_connections,
+                connect_timeout=connect_timeout,
+                read_timeout=read_timeout,
+                retries={"max_attempts": max_attempts, "mode": "standard"},
+                tcp_keepalive=True,
+            ),
+        )
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_pool_connections, thread_name_prefix="s3"
+        )
 
-    def upload_avatar(
+    async def upload_avatar(
         self,
         file: bytes,
         bucket: str,
@@ -18,11 +55,96 @@ class S3Client:
         if content_type:
             extra_args["ContentType"] = content_type
 
-        self._client.put_object(Body=file, Bucket=bucket, Key=key, **extra_args)
-        return self._get_public_url(bucket=bucket, key=key)
+        await self._run(
+            self._client.put_object, Body=file, Bucket=bucket, Key=key, **extra_args
+        )
+        return self.get_public_url(bucket=bucket, key=key)
 
-    def delete(self, bucket: str, key: str) -> None:
-        self._client.delete_object(Bucket=bucket, Key=key)
+    async def delete(self, bucket: str, key: str) -> None:
+        await self._run(self._client.delete_object, Bucket=bucket, Key=key)
 
-    def _get_public_url(self, bucket: str, key: str) -> str:
+    async def create_presigned_post(
+        self,
+        bucket: str,
+        key: str,
+        content_type: str,
+        max_size: int,
+        expires_in: int,
+        cache_control: str = "public, max-age=31536000, immutable",
+    ) -> dict:
+        """
+        Presigned POST that only accepts the given content type and at most
+        max_size bytes.
+        """
+        fields = {"Content-Type": content_type, "Cache-Control": cache_control}
+        return await self._run(
+            self._client.generate_presigned_post,
+            Bucket=bucket,
+            Key=key,
+            Fields=fields,
+            Conditions=[
+                {"Content-Type": content_type},
+                {"Cache-Control": cache_control},
+                ["content-length-range", 1, max_size],
+            ],
+            ExpiresIn=expires_in,
+        )
+
+    async def head(self, bucket: str, key: str) -> dict | None:
+        try:
+            return await self._run(self._client.head_object, Bucket=bucket, Key=key)
+        except ClientError as e:
+            if e.response["Error"]["Code"] in {"404", "NoSuchKey", "NotFound"}:
+                return None
+            raise
+
+    async def download(self, bucket: str, key: str) -> bytes:
+        response = await self._run(self._client.get_object, Bucket=bucket, Key=key)
+        with response["Body"] as body:
+            return await self._run(body.read)
+
+    async def put_expiration_rule(
+        self, bucket: str, rule_id: str, prefix: str, days: int
+    ) -> None:
+        """
+        Expire the objects under prefix after the given number of days.
+
+        The rule replaces the one with the same id, other lifecycle rules of
+        the bucket are kept.
+        """
+        try:
+            response = await self._run(
+                self._client.get_bucket_lifecycle_configuration, Bucket=bucket
+            )
+            rules = response["Rules"]
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "NoSuchLifecycleConfiguration":
+                raise
+            rules = []
+        rules = [rule for rule in rules if rule.get("ID") != rule_id]
+        rules.append(
+            {
+                "ID": rule_id,
+                "Filter": {"Prefix": prefix},
+                "Status": "Enabled",
+                "Expiration": {"Days": days},
+                "AbortIncompleteMultipartUpload": {"DaysAfterInitiation": days},
+            }
+        )
+        await self._run(
+            self._client.put_bucket_lifecycle_configuration,
+            Bucket=bucket,
+            LifecycleConfiguration={"Rules": rules},
+        )
+
+    def get_key(self, bucket: str, url: str) -> str:
+        return url.removeprefix(self.get_public_url(bucket=bucket, key=""))
+
+    def get_public_url(self, bucket: str, key: str) -> str:
+        if self._endpoint_url:
+            return f"{self._endpoint_url}/{bucket}/{key}"
         return f"https://{bucket}.s3.{self._region}.amazonaws.com/{key}"
+
+    async def _run(self, func, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, **kwargs))
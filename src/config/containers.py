@@ -1,29 +1,65 @@
 from dependency_injector import containers, providers
-from openai import OpenAI
+from openai import AsyncOpenAI
 from sqlalchemy import NullPool
 from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 
 from app.services import AppService
+from auth.cache import UserInfoCache
+from auth.hasher import PasswordHasher
+from auth.image import AvatarProcessor
 from auth.services.authentication import JWTAuthenticationService
 from auth.services.registration import RegistrationService
 from auth.services.uploader import AvatarUploader
 from auth.services.user import UserService
+from cache import DiskCacheBackend, MemoryCacheBackend
 from calorie.openai_client.client import CalorieOpenAIClient
+from calorie.openai_client.image import ImagePreprocessor
+from calorie.openai_client.limiter import LLMLimiter
 from calorie.services.day import DayService
+from calorie.services.ingestion_job import IngestionJobQueue
 from calorie.services.product import ProductService
 from calorie.services.trend import TrendService
+from calorie.weight_trend import WeightTrendUpdater
 from clients.s3 import S3Client
 from config import settings
+from database import MonitoredAsyncQueuePool, RaiseOnLazyLoadSession
 from notification.services.email import EmailNotificationService
-from unitofwork import UnitOfWork
+from notification.smtp import (
+    EmailTemplateRenderer,
+    SMTPConnectionPool,
+    SMTPEmailSender,
+)
+from notification.worker import EmailOutboxWorker
+from stats import StatsLogger
+from unitofwork import UnitOfWork, UnitOfWorkScope
 
 
 def create_db_engine(
-    user: str, password: str, host: str, port: str, db_name: str
+    user: str,
+    password: str,
+    host: str,
+    port: str,
+    db_name: str,
+    use_null_pool: bool = False,
+    pool_size: int = 5,
+    pool_max_overflow: int = 10,
+    pool_recycle: int = 1800,
+    pool_pre_ping: bool = True,
+    pool_timeout: int = 30,
 ) -> AsyncEngine:
     database_url = f"postgresql+asyncpg://{user}:{password}@{host}:{port}/{db_name}"
-    return create_async_engine(database_url, poolclass=NullPool)
+    if use_null_pool:
+        return create_async_engine(database_url, poolclass=NullPool)
+    return create_async_engine(
+        database_url,
+        poolclass=MonitoredAsyncQueuePool,
+        pool_size=pool_size,
+        max_overflow=pool_max_overflow,
+        pool_recycle=pool_recycle,
+        pool_pre_ping=pool_pre_ping,
+        pool_timeout=pool_timeout,
+    )
 
 
 class Container(containers.DeclarativeContainer):
@@ -34,27 +70,189 @@ class Container(containers.DeclarativeContainer):
         host=settings.db.host,
         port=settings.db.port,
         db_name=settings.db.db_name,
+        use_null_pool=settings.db.use_null_pool,
+        pool_size=settings.db.pool_size,
+        pool_max_overflow=settings.db.pool_max_overflow,
+        pool_recycle=settings.db.pool_recycle,
+        pool_pre_ping=settings.db.pool_pre_ping,
+        pool_timeout=settings.db.pool_timeout,
     )
     async_session_maker = providers.Singleton(
         sessionmaker,
         bind=db_engine,
         class_=AsyncSession,
+        sync_session_class=(
+            RaiseOnLazyLoadSession if settings.db.raise_on_lazy_load else Session
+        ),
         expire_on_commit=False,
     )
-    openai_client = providers.Singleton(OpenAI, api_key=settings.openai.api_key)
-    calorie_openai_client = providers.Factory(CalorieOpenAIClient, client=openai_client)
-    s3_client = providers.Factory(S3Client, region=settings.s3.region)
+    openai_client = providers.Singleton(AsyncOpenAI, api_key=settings.openai.api_key)
+    llm_cache = providers.Selector(
+        providers.Object(settings.llm_cache.backend),
+        memory=providers.Singleton(
+            MemoryCacheBackend,
+            ttl=settings.llm_cache.ttl,
+            max_entries=settings.llm_cache.max_entries,
+        ),
+        disk=providers.Singleton(
+            DiskCacheBackend,
+            ttl=settings.llm_cache.ttl,
+            path=settings.llm_cache.disk_path,
+            max_bytes=settings.llm_cache.disk_max_bytes,
+        ),
+        none=providers.Object(None),
+    )
+    image_preprocessor = (
+        providers.Singleton(
+            ImagePreprocessor,
+            max_edge=settings.ingest_image.max_edge,
+            grayscale=settings.ingest_image.grayscale,
+            autocontrast=settings.ingest_image.autocontrast,
+            image_format=settings.ingest_image.format,
+            quality=settings.ingest_image.quality,
+        )
+        if settings.ingest_image.preprocess
+        else providers.Object(None)
+    )
+    llm_limiter = providers.Singleton(
+        LLMLimiter,
+        max_in_flight=settings.llm_limiter.max_in_flight,
+        tokens_per_minute=settings.llm_limiter.tokens_per_minute,
+        estimated_tokens=settings.llm_limiter.estimated_tokens,
+    )
+    calorie_openai_client = providers.Factory(
+        CalorieOpenAIClient,
+        client=openai_client,
+        limiter=llm_limiter,
+        cache=llm_cache,
+        image_preprocessor=image_preprocessor,
+    )
+    s3_client = providers.Singleton(
+        S3Client,
+        region=settings.s3.region,
+        endpoint_url=settings.s3.endpoint_url,
+        max_pool_connections=settings.s3.max_pool_connections,
+        connect_timeout=settings.s3.connect_timeout,
+        read_timeout=settings.s3.read_timeout,
+        max_attempts=settings.s3.max_attempts,
+    )
 
+    uow_scope = providers.Factory(
+        UnitOfWorkScope,
+        async_session_maker=async_session_maker,
+        engine=db_engine,
+        shared=settings.db.request_scoped_uow,
+    )
     uow = providers.Factory(UnitOfWork, async_session_maker=async_session_maker)
 
-    jwt_authentication_service = providers.Factory(JWTAuthenticationService, uow=uow)
-    registration_service = providers.Factory(RegistrationService, uow=uow)
+    user_cache = (
+        providers.Singleton(
+            UserInfoCache,
+            ttl=settings.user_cache.ttl,
+            max_entries=settings.user_cache.max_entries,
+        )
+        if settings.user_cache.enabled
+        else providers.Object(None)
+    )
+    password_hasher = providers.Singleton(
+        PasswordHasher,
+        workers=settings.password_hash.workers,
+        time_cost=settings.password_hash.time_cost,
+        memory_cost=settings.password_hash.memory_cost,
+        parallelism=settings.password_hash.parallelism,
+    )
+    jwt_authentication_service = providers.Factory(
+        JWTAuthenticationService,
+        uow=uow,
+        password_hasher=password_hasher,
+        user_cache=user_cache,
+    )
+    registration_service = providers.Factory(
+        RegistrationService,
+        uow=uow,
+        password_hasher=password_hasher,
+        user_cache=user_cache,
+    )
     user_service = providers.Factory(UserService, uow=uow)
     notification_service = providers.Factory(EmailNotificationService, uow=uow)
+    email_template_renderer = providers.Singleton(
+        EmailTemplateRenderer, templates_dir=settings.email.templates_dir
+    )
+    smtp_pool = providers.Singleton(
+        SMTPConnectionPool,
+        hostname=settings.email.smtp_server,
+        port=settings.email.smtp_port,
+        username=settings.email.smtp_username,
+        password=settings.email.smtp_password,
+        use_credentials=settings.email.use_credentials,
+        start_tls=settings.email.smtp_starttls,
+        use_tls=settings.email.smtp_ssl_tls,
+        timeout=settings.email.smtp_timeout,
+        size=settings.email_outbox.smtp_connections,
+    )
+    email_sender = providers.Singleton(
+        SMTPEmailSender,
+        pool=smtp_pool,
+        renderer=email_template_renderer,
+        sender=settings.email.smtp_from,
+    )
+    email_outbox_worker = providers.Singleton(
+        EmailOutboxWorker,
+        uow_factory=uow.provider,
+        sender=email_sender,
+        batch_size=settings.email_outbox.batch_size,
+        poll_interval=settings.email_outbox.poll_interval,
+        max_attempts=settings.email_outbox.max_attempts,
+        backoff_base=settings.email_outbox.backoff_base,
+        backoff_max=settings.email_outbox.backoff_max,
+        lease=settings.email_outbox.lease,
+    )
     app_service = providers.Factory(AppService, uow=uow)
     trend_service = providers.Factory(TrendService, uow=uow)
+    weight_trend_updater = providers.Singleton(
+        WeightTrendUpdater,
+        smoothing=settings.weight_trend.smoothing,
+        max_propagation_days=settings.weight_trend.max_propagation_days,
+    )
     day_service = providers.Factory(
-        DayService, uow=uow, calorie_openai_client=calorie_openai_client
+        DayService,
+        uow=uow,
+        calorie_openai_client=calorie_openai_client,
+        weight_trend_updater=weight_trend_updater,
+    )
+    ingestion_job_queue = providers.Singleton(
+        IngestionJobQueue,
+        day_service_factory=day_service.provider,
+        workers=settings.ingest_jobs.workers,
+        max_queued=settings.ingest_jobs.max_queued,
+        job_ttl=settings.ingest_jobs.job_ttl,
+    )
+    product_service = providers.Factory(
+        ProductService,
+        uow=uow,
+        search_count_cap=settings.product_search.count_cap,
+    )
+    avatar_processor = providers.Singleton(
+        AvatarProcessor,
+        sizes=settings.avatar.sizes,
+        quality=settings.avatar.quality,
+    )
+    avatar_uploader = providers.Factory(
+        AvatarUploader,
+        uow=uow,
+        s3_client=s3_client,
+        avatar_processor=avatar_processor,
+        user_cache=user_cache,
+    )
+    stats_logger = providers.Singleton(
+        StatsLogger,
+        interval=settings.stats.log_interval,
+        engine=db_engine,
+        components=providers.Dict(
+            llm_cache=llm_cache,
+            image_preprocessing=image_preprocessor,
+            llm_limiter=llm_limiter,
+            user_cache=user_cache,
+            password_hasher=password_hasher,
+        ),
     )
-    product_service = providers.Factory(ProductService, uow=uow)
-    avatar_uploader = providers.Factory(AvatarUploader, uow=uow, s3_client=s3_client)
@@ -6,14 +6,16 @@ from fastapi.security.utils import get_authorization_scheme_param
 
 from app.services import AppService
 from auth.exceptions import AuthenticationException
-from auth.models import UserInfoDTO
+from auth.models import UserClaimsDTO, UserInfoDTO
 from auth.services.authentication import JWTAuthenticationService
 from auth.services.registration import RegistrationService
 from auth.services.uploader import AvatarUploader
 from auth.services.user import UserService
 from calorie.services.day import DayService
+from calorie.services.ingestion_job import IngestionJobQueue
 from calorie.services.product import ProductService
 from calorie.services.trend import TrendService
+from config import settings
 from config.containers import Container
 from notification.services.email import EmailNotificationService
 
@@ -42,7 +44,7 @@ async def use_token(request: Request) -> str:
 
 
 @inject
-async def get_authenticated_user(
+async def get_user_profile(
     jwt_auth_service: JWTAuthenticationDep, token: str = Depends(use_token)
 ) -> UserInfoDTO:
     try:
@@ -56,19 +58,46 @@ async def get_authenticated_user(
     return user
 
 
-AuthenticatedUserDep = Annotated[UserInfoDTO, Depends(get_authenticated_user)]
+UserProfileDep = Annotated[UserInfoDTO, Depends(get_user_profile)]
 
 
-def active_user(user: AuthenticatedUserDep) -> UserInfoDTO:
+@inject
+async def get_authenticated_user(
+    jwt_auth_service: JWTAuthenticationDep, token: str = Depends(use_token)
+) -> UserClaimsDTO:
+    """
+    In stateless JWT mode the user is read from the token claims,
+    otherwise it is loaded like the profile.
+    """
+    try:
+        if settings.jwt.stateless:
+            return await jwt_auth_service.get_current_user_claims(token)
+        user = await jwt_auth_service.get_current_user(token)
+    except AuthenticationException:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return UserClaimsDTO(id=user.id, is_verified=user.is_verified)
+
+
+AuthenticatedUserDep = Annotated[UserClaimsDTO, Depends(get_authenticated_user)]
+
+
+def active_user(user: AuthenticatedUserDep) -> UserClaimsDTO:
     if not user.is_verified:
         raise HTTPException(status.HTTP_403_FORBIDDEN, detail="User is not verified")
     return user
 
 
-ActiveUserDep = Annotated[UserInfoDTO, Depends(active_user)]
+ActiveUserDep = Annotated[UserClaimsDTO, Depends(active_user)]
 AppServiceDep = Annotated[AppService, Depends(Provide[Container.app_service])]
 TrendServiceDep = Annotated[TrendService, Depends(Provide[Container.trend_service])]
 DayServiceDep = Annotated[DayService, Depends(Provide[Container.day_service])]
+IngestionJobQueueDep = Annotated[
+    IngestionJobQueue, Depends(Provide[Container.ingestion_job_queue])
+]
 ProductServiceDep = Annotated[
     ProductService, Depends(Provide[Container.product_service])
 ]
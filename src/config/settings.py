@@ -1,4 +1,7 @@
-from pydantic import BaseModel
+from decimal import Decimal
+from typing import Literal
+
+from pydantic import BaseModel, Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -8,12 +11,34 @@ class PostgresDBSettings(BaseModel):
     user: str = "postgres"
     password: str = "postgres"
     db_name: str = "postgres"
+    use_null_pool: bool = False
+    pool_size: int = 5
+    pool_max_overflow: int = 10
+    pool_recycle: int = 1800
+    pool_pre_ping: bool = True
+    pool_timeout: int = 30
+    request_scoped_uow: bool = False
+    raise_on_lazy_load: bool = False
 
 
 class JWTSettings(BaseModel):
     access_token_expire_minutes: int = 30
     refresh_token_expire_days: int = 7
     algorithm: str = "HS256"
+    stateless: bool = False
+
+
+class PasswordHashSettings(BaseModel):
+    workers: int = 2
+    time_cost: int = 3
+    memory_cost: int = 65536
+    parallelism: int = 4
+
+
+class UserCacheSettings(BaseModel):
+    enabled: bool = True
+    ttl: int = 60
+    max_entries: int = 10_000
 
 
 class EmailSettings(BaseModel):
@@ -25,6 +50,18 @@ class EmailSettings(BaseModel):
     smtp_starttls: bool = False
     smtp_ssl_tls: bool = False
     use_credentials: bool = False
+    smtp_timeout: float = 30.0
+    templates_dir: str = "/app/templates"
+
+
+class EmailOutboxSettings(BaseModel):
+    batch_size: int = 20
+    poll_interval: float = 2.0
+    max_attempts: int = 5
+    backoff_base: int = 30
+    backoff_max: int = 60 * 60
+    lease: int = 60
+    smtp_connections: int = 2
 
 
 class TZSettings(BaseModel):
@@ -37,9 +74,64 @@ class OpenAISettings(BaseModel):
     model_text: str = ""
 
 
+class IngestImageSettings(BaseModel):
+    preprocess: bool = True
+    max_edge: int = 1600
+    grayscale: bool = True
+    autocontrast: bool = True
+    format: Literal["JPEG", "WEBP"] = "WEBP"
+    quality: int = 80
+
+
+class IngestJobSettings(BaseModel):
+    workers: int = 2
+    max_queued: int = 20
+    job_ttl: int = 60 * 60
+
+
+class LLMCacheSettings(BaseModel):
+    backend: Literal["memory", "disk", "none"] = "memory"
+    ttl: int = 7 * 24 * 60 * 60
+    max_entries: int = 1024
+    disk_path: str = "/tmp/main-be/llm-cache"
+    disk_max_bytes: int = 256 * 1024 * 1024
+
+
+class LLMLimiterSettings(BaseModel):
+    max_in_flight: int = 4
+    tokens_per_minute: int = 200_000
+    estimated_tokens: int = 2_000
+
+
+class ProductSearchSettings(BaseModel):
+    count_cap: int = 0
+
+
+class WeightTrendSettings(BaseModel):
+    smoothing: Decimal = Field(Decimal("0.1"), gt=0, le=1)
+    max_propagation_days: int = 60
+
+
+class AvatarSettings(BaseModel):
+    sizes: list[int] = [64, 128, 256]
+    quality: int = 80
+    max_upload_bytes: int = 5 * 1024 * 1024
+    presigned_expires_in: int = 300
+    upload_expiration_days: int = Field(1, ge=1)
+
+
 class S3Settings(BaseModel):
     region: str = "eu-north-1"
     avatar_bucket: str = ""
+    endpoint_url: str = ""
+    max_pool_connections: int = 10
+    connect_timeout: int = 5
+    read_timeout: int = 30
+    max_attempts: int = 3
+
+
+class StatsSettings(BaseModel):
+    log_interval: float = 300.0
 
 
 class Settings(BaseSettings):
@@ -47,10 +139,21 @@ class Settings(BaseSettings):
 
     db: PostgresDBSettings = PostgresDBSettings()
     jwt: JWTSettings = JWTSettings()
+    password_hash: PasswordHashSettings = PasswordHashSettings()
+    user_cache: UserCacheSettings = UserCacheSettings()
     email: EmailSettings = EmailSettings()
+    email_outbox: EmailOutboxSettings = EmailOutboxSettings()
     tz: TZSettings = TZSettings()
     openai: OpenAISettings = OpenAISettings()
+    llm_cache: LLMCacheSettings = LLMCacheSettings()
+    llm_limiter: LLMLimiterSettings = LLMLimiterSettings()
+    ingest_image: IngestImageSettings = IngestImageSettings()
+    ingest_jobs: IngestJobSettings = IngestJobSettings()
+    product_search: ProductSearchSettings = ProductSearchSettings()
+    weight_trend: WeightTrendSettings = WeightTrendSettings()
+    avatar: AvatarSettings = AvatarSettings()
     s3: S3Settings = S3Settings()
+    stats: StatsSettings = StatsSettings()
 
     model_config = SettingsConfigDict(
         env_file=".env",
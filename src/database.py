@@ -1,9 +1,27 @@
+import time
 import uuid
 from datetime import datetime
 from typing import Annotated
 
-from sqlalchemy import UUID, DateTime, MetaData, func, text
-from sqlalchemy.orm import DeclarativeBase, mapped_column
+from sqlalchemy import (
+    UUID,
+    AsyncAdaptedQueuePool,
+    DateTime,
+    MetaData,
+    event,
+    func,
+    text,
+)
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import (
+    DeclarativeBase,
+    ORMExecuteState,
+    Session,
+    mapped_column,
+    raiseload,
+)
+
+from models import DBPoolStatsDTO
 
 uuidpk = Annotated[
     uuid.UUID, mapped_column(primary_key=True, default=uuid.uuid4, index=True)
@@ -38,3 +56,59 @@ class Base(DeclarativeBase):
 
 
 metadata = MetaData()
+
+
+class MonitoredAsyncQueuePool(AsyncAdaptedQueuePool):
+    """
+    Async queue pool that also tracks how long callers wait for a connection.
+
+    Wait time covers the whole checkout: queue wait, overflow connection
+    creation and pre-ping.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    def connect(self):
+        started_at = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            waited = time.perf_counter() - started_at
+            self.checkouts += 1
+            self.wait_time_total += waited
+            self.wait_time_max = max(self.wait_time_max, waited)
+
+
+class RaiseOnLazyLoadSession(Session):
+    """
+    Session that makes every relationship load not requested by a loader
+    option raise, including many-to-one ones. Meant for tests and development.
+    """
+
+
+@event.listens_for(RaiseOnLazyLoadSession, "do_orm_execute")
+def _add_raiseload(state: ORMExecuteState) -> None:
+    # Loads issued by eager options carry their own options.
+    if state.is_select and not state.is_relationship_load:
+        state.statement = state.statement.options(raiseload("*"))
+
+
+def get_pool_stats(engine: AsyncEngine) -> DBPoolStatsDTO:
+    pool = engine.pool
+    if not isinstance(pool, MonitoredAsyncQueuePool):
+        return DBPoolStatsDTO(pool_class=type(pool).__name__)
+    return DBPoolStatsDTO(
+        pool_class=type(pool).__name__,
+        size=pool.size(),
+        checked_out=pool.checkedout(),
+        idle=pool.checkedin(),
+        overflow=max(pool.overflow(), 0),
+        checkouts=pool.checkouts,
+        wait_time_total=pool.wait_time_total,
+        wait_time_avg=pool.wait_time_total / pool.checkouts if pool.checkouts else 0.0,
+        wait_time_max=pool.wait_time_max,
+    )
@@ -1,4 +1,7 @@
+import asyncio
+import logging
 import sys
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request, status
 from fastapi.encoders import jsonable_encoder
@@ -10,6 +13,7 @@ import app.router as app_router_module
 import auth.router as auth_router_module
 import calorie.router as calorie_router_module
 from config.containers import Container
+from middleware import UnitOfWorkScopeMiddleware
 from models import (
     ErrorResponseDTO,
     MessageErrorResponseDTO,
@@ -17,8 +21,19 @@ from models import (
 )
 from utils import PydanticConvertor
 
+logging.basicConfig(level=logging.INFO)
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    stats_task = asyncio.create_task(container.stats_logger().run())
+    yield
+    stats_task.cancel()
+
+
 app = FastAPI(
     title="Main service",
+    lifespan=lifespan,
     responses={
         401: {"model": ErrorResponseDTO[MessageErrorResponseDTO]},
         422: {"model": ErrorResponseDTO[PydanticErrorResponseDTO]},
@@ -46,6 +61,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(UnitOfWorkScopeMiddleware, scope_factory=container.uow_scope)
 
 
 @app.exception_handler(RequestValidationError)
@@ -0,0 +1,45 @@
+from typing import Callable
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from unitofwork import UnitOfWorkScope
+
+
+class UnitOfWorkScopeMiddleware:
+    """
+    Opens a UnitOfWorkScope for every HTTP request.
+
+    The scope stays open until the response (including background tasks)
+    is finished. Event streams can stay open for minutes, so the shared
+    connection is released when one starts instead of being held for the
+    whole stream. Session counters are reported in the X-DB-Sessions and
+    X-DB-Units response headers.
+    """
+
+    def __init__(
+        self, app: ASGIApp, scope_factory: Callable[[], UnitOfWorkScope]
+    ) -> None:
+        self.app = app
+        self._scope_factory = scope_factory
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async with self._scope_factory() as uow_scope:
+
+            async def send_with_stats(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    headers = MutableHeaders(scope=message)
+                    headers.append(
+                        "X-DB-Sessions", str(uow_scope.stats.sessions_opened)
+                    )
+                    headers.append("X-DB-Units", str(uow_scope.stats.units_entered))
+                    content_type = headers.get("content-type", "")
+                    if content_type.startswith("text/event-stream"):
+                        await uow_scope.release()
+                await send(message)
+
+            await self.app(scope, receive, send_with_stats)
@@ -31,9 +31,40 @@ class MessageErrorResponseDTO(BaseModel):
 class PaginationDTO(BaseModel, Generic[S]):
     page_count: int
     total_count: int
+    is_total_count_capped: bool = False
     data: list[S]
 
 
+class CursorPaginationDTO(BaseModel, Generic[S]):
+    next_cursor: str | None
+    data: list[S]
+
+
+class DBPoolStatsDTO(BaseModel):
+    pool_class: str
+    size: int = 0
+    checked_out: int = 0
+    idle: int = 0
+    overflow: int = 0
+    checkouts: int = 0
+    wait_time_total: float = 0.0
+    wait_time_avg: float = 0.0
+    wait_time_max: float = 0.0
+
+
+class UnitOfWorkStatsDTO(BaseModel):
+    sessions_opened: int = 0
+    units_entered: int = 0
+
+
+class CacheStatsDTO(BaseModel):
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    entries: int = 0
+
+
 class ErrorEventDTO(BaseModel):
     event: Literal["error"]
     data: dict[str, str]
@@ -66,6 +97,7 @@ class SearchDTO(BaseModel):
 
 class PaginatedSearchFilterDTO(SearchDTO):
     page: int = 1
+    cursor: str | None = None
 
 
 class ObjectCreationDTO(BaseModel):
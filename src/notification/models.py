@@ -1,4 +1,6 @@
 from datetime import datetime, timezone
+from enum import StrEnum
+from typing import Any
 from uuid import UUID
 
 from pydantic import BaseModel, ConfigDict
@@ -31,3 +33,30 @@ class VerificationCodeInDBDTO(BaseModel):
 
     def to_user_info(self) -> VerificationCodeDTO:
         return VerificationCodeDTO(**self.model_dump())
+
+
+class EmailOutboxStatusEnum(StrEnum):
+    PENDING = "pending"
+    SENT = "sent"
+    FAILED = "failed"
+
+
+class EmailOutboxDTO(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: UUID
+    template: str
+    subject: str
+    recipient_email: str
+    recipient_name: str
+    context: dict[str, Any]
+    attempts: int
+
+
+class EmailOutboxStatsDTO(BaseModel):
+    batches: int = 0
+    sent: int = 0
+    retried: int = 0
+    failed: int = 0
+    send_time_total: float = 0
+    sent_per_second: float = 0
@@ -2,10 +2,11 @@ import uuid
 from datetime import datetime, timedelta, timezone
 from typing import TYPE_CHECKING
 
-from sqlalchemy import UUID, DateTime, ForeignKey
+from sqlalchemy import UUID, DateTime, ForeignKey, Index, func
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
-from database import Base, uuidpk
+from database import Base, created_at, uuidpk
 
 if TYPE_CHECKING:
     from auth.orm import User
@@ -31,3 +32,27 @@ class VerificationCode(Base):
     )
 
     user: Mapped["User"] = relationship("User", back_populates="verification_code")
+
+
+class EmailOutbox(Base):
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        Index("ix_email_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+    id: Mapped[uuidpk]
+    template: Mapped[str] = mapped_column(nullable=False)
+    subject: Mapped[str] = mapped_column(nullable=False)
+    recipient_email: Mapped[str] = mapped_column(nullable=False)
+    recipient_name: Mapped[str] = mapped_column(nullable=False)
+    context: Mapped[dict] = mapped_column(JSONB, nullable=False)
+    status: Mapped[str] = mapped_column(default="pending", nullable=False)
+    attempts: Mapped[int] = mapped_column(default=0, nullable=False)
+    next_attempt_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+    last_error: Mapped[str | None] = mapped_column(nullable=True)
+    created_at: Mapped[created_at]
+    sent_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
@@ -1,10 +1,14 @@
-from typing import Sequence
+from datetime import datetime, timedelta
+from typing import Any, Sequence
 from uuid import UUID
 
+from sqlalchemy import func, select, update
 from sqlalchemy.dialects.postgresql import insert
 
 from notification import orm
 from notification.models import (
+    EmailOutboxDTO,
+    EmailOutboxStatusEnum,
     MergeVerificationCode,
     VerificationCodeDTO,
     VerificationCodeInDBDTO,
@@ -41,3 +45,77 @@ class VerificationCodeRepository(SQLAlchemyRepository):
     async def get_by_user_id(self, user_id: UUID) -> VerificationCodeDTO | None:
         code = await self.get(user_id=user_id)
         return VerificationCodeDTO.model_validate(code)
+
+
+class EmailOutboxRepository(SQLAlchemyRepository):
+    model = orm.EmailOutbox
+
+    async def add_email(
+        self,
+        template: str,
+        subject: str,
+        recipient_email: str,
+        recipient_name: str,
+        context: dict[str, Any],
+    ) -> None:
+        stmt = insert(self.model).values(
+            template=template,
+            subject=subject,
+            recipient_email=recipient_email,
+            recipient_name=recipient_name,
+            context=context,
+        )
+        await self._session.execute(stmt)
+
+    async def claim_batch(self, limit: int, lease: int) -> list[EmailOutboxDTO]:
+        """
+        Take due pending emails and count an attempt for each of them.
+
+        Their next attempt is moved lease seconds ahead, so other workers
+        skip them while they are being sent. Rows locked by another worker
+        are skipped as well.
+        """
+        due_ids = (
+            select(self.model.id)
+            .where(
+                self.model.status == EmailOutboxStatusEnum.PENDING,
+                self.model.next_attempt_at <= func.now(),
+            )
+            .order_by(self.model.next_attempt_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        stmt = (
+            update(self.model)
+            .where(self.model.id.in_(due_ids.scalar_subquery()))
+            .values(
+                attempts=self.model.attempts + 1,
+                next_attempt_at=func.now() + timedelta(seconds=lease),
+            )
+            .returning(self.model)
+        )
+        emails = (await self._session.execute(stmt)).scalars().all()
+        return [EmailOutboxDTO.model_validate(email) for email in emails]
+
+    async def mark_sent(self, ids: list[UUID]) -> None:
+        stmt = (
+            update(self.model)
+            .where(self.model.id.in_(ids))
+            .values(
+                status=EmailOutboxStatusEnum.SENT, sent_at=func.now(), last_error=None
+            )
+        )
+        await self._session.execute(stmt)
+
+    async def mark_failed(
+        self, id_: UUID, error: str, next_attempt_at: datetime | None
+    ) -> None:
+        """
+        Schedule a retry at next_attempt_at, or give up when it is None.
+        """
+        values: dict[str, Any] = {"last_error": error}
+        if next_attempt_at is None:
+            values["status"] = EmailOutboxStatusEnum.FAILED
+        else:
+            values["next_attempt_at"] = next_attempt_at
+        await self.update({"id": id_}, **values)
@@ -1,7 +1,7 @@
 import random
-from abc import ABC
-from uuid import UUID
+from abc import ABC, abstractmethod
 
+from auth.models import UserInfoDTO
 from notification.models import MergeVerificationCode
 from unitofwork import IUnitOfWork
 
@@ -10,14 +10,22 @@ class INotificationService(ABC):
     def __init__(self, uow: IUnitOfWork):
         self._uow = uow
 
-    async def create_verification_code(self, user_id: UUID) -> int:
+    async def create_verification_code(self, user: UserInfoDTO) -> int:
         code = self._generate_verification_code()
-        merge_code = MergeVerificationCode(code=code, user_id=user_id)
+        merge_code = MergeVerificationCode(code=code, user_id=user.id)
         async with self._uow:
             await self._uow.verification_codes.add_or_update(merge_code)
+            await self._enqueue_verification_code(user, code)
             await self._uow.commit()
         return code
 
+    @abstractmethod
+    async def _enqueue_verification_code(self, user: UserInfoDTO, code: int) -> None:
+        """
+        Queue the code for delivery within the transaction that stores it.
+        """
+        raise NotImplementedError
+
     @staticmethod
     def _generate_verification_code() -> int:
         return random.randint(100000, 999999)
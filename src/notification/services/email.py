@@ -1,46 +1,20 @@
 from datetime import datetime
-from pathlib import Path
-
-from aiosmtplib import SMTPReadTimeoutError
-from fastapi_mail import ConnectionConfig, FastMail, MessageSchema, MessageType
-from pydantic import NameEmail
 
 from auth.models import UserInfoDTO
-from config import settings
 from notification.services.base import INotificationService
 
-conf = ConnectionConfig(
-    MAIL_USERNAME=settings.email.smtp_username,
-    MAIL_PASSWORD=settings.email.smtp_password,
-    MAIL_FROM=settings.email.smtp_from,
-    MAIL_PORT=settings.email.smtp_port,
-    MAIL_SERVER=settings.email.smtp_server,
-    MAIL_STARTTLS=settings.email.smtp_starttls,
-    MAIL_SSL_TLS=settings.email.smtp_ssl_tls,
-    USE_CREDENTIALS=settings.email.use_credentials,
-    TEMPLATE_FOLDER=Path("/app/templates"),
-)
-
-fm = FastMail(conf)
-
 
 class EmailNotificationService(INotificationService):
-    @staticmethod
-    async def send_verification_code(user: UserInfoDTO, code: int) -> None:
-        try:
-            message = MessageSchema(
-                subject="Confirm your email",
-                recipients=[NameEmail(name=user.username, email=user.email)],
-                template_body={
-                    "username": user.username,
-                    "email": user.email,
-                    "verification_code": code,
-                    "year": datetime.now().year,
-                },
-                subtype=MessageType.html,
-            )
-            await fm.send_message(message, template_name="email-verification.html")
-        except SMTPReadTimeoutError:
-            pass
-        except Exception:
-            pass
+    async def _enqueue_verification_code(self, user: UserInfoDTO, code: int) -> None:
+        await self._uow.email_outbox.add_email(
+            template="email-verification.html",
+            subject="Confirm your email",
+            recipient_email=user.email,
+            recipient_name=user.username,
+            context={
+                "username": user.username,
+                "email": user.email,
+                "verification_code": code,
+                "year": datetime.now().year,
+            },
+        )
@@ -0,0 +1,137 @@
+import asyncio
+from contextlib import asynccontextmanager
+from email.message import EmailMessage
+from email.utils import formataddr
+from typing import Any, AsyncIterator
+
+from aiosmtplib import SMTP, SMTPServerDisconnected
+from jinja2 import Environment, FileSystemLoader, Template, select_autoescape
+
+
+class EmailTemplateRenderer:
+    """
+    Compiles every template in templates_dir once, at startup.
+    """
+
+    def __init__(self, templates_dir: str) -> None:
+        environment = Environment(
+            loader=FileSystemLoader(templates_dir),
+            autoescape=select_autoescape(),
+        )
+        self._templates: dict[str, Template] = {
+            name: environment.get_template(name)
+            for name in environment.list_templates()
+        }
+
+    def render(self, name: str, context: dict[str, Any]) -> str:
+        return self._templates[name].render(context)
+
+
+class SMTPConnectionPool:
+    """
+    Keeps up to size logged-in SMTP connections open between sends.
+
+    Connections are opened lazily. A connection the server dropped while it
+    was idle is reopened once before the send fails.
+    """
+
+    def __init__(
+        self,
+        hostname: str,
+        port: int,
+        username: str,
+        password: str,
+        use_credentials: bool,
+        start_tls: bool,
+        use_tls: bool,
+        timeout: float,
+        size: int,
+    ) -> None:
+        self._hostname = hostname
+        self._port = port
+        self._username = username
+        self._password = password
+        self._use_credentials = use_credentials
+        self._start_tls = start_tls
+        self._use_tls = use_tls
+        self._timeout = timeout
+        self._clients: asyncio.Queue[SMTP] = asyncio.Queue()
+        for _ in range(size):
+            self._clients.put_nowait(self._create_client())
+
+    async def send_message(self, message: EmailMessage) -> None:
+        async with self._acquire() as client:
+            try:
+                await self._ensure_connected(client)
+                await client.send_message(message)
+            except SMTPServerDisconnected:
+                await self._ensure_connected(client)
+                await client.send_message(message)
+
+    async def close(self) -> None:
+        while not self._clients.empty():
+            client = self._clients.get_nowait()
+            if client.is_connected:
+                try:
+                    await client.quit()
+                except Exception:
+                    client.close()
+
+    @asynccontextmanager
+    async def _acquire(self) -> AsyncIterator[SMTP]:
+        client = await self._clients.get()
+        try:
+            yield client
+        except Exception:
+            # The session may be mid-command, so start over on the next send.
+            client.close()
+            raise
+        finally:
+            self._clients.put_nowait(client)
+
+    async def _ensure_connected(self, client: SMTP) -> None:
+        if client.is_connected:
+            try:
+                await client.noop()
+                return
+            except SMTPServerDisconnected:
+                client.close()
+        await client.connect()
+        if self._use_credentials:
+            await client.login(self._username, self._password)
+
+    def _create_client(self) -> SMTP:
+        return SMTP(
+            hostname=self._hostname,
+            port=self._port,
+            use_tls=self._use_tls,
+            start_tls=self._start_tls,
+            timeout=self._timeout,
+        )
+
+
+class SMTPEmailSender:
+    def __init__(
+        self, pool: SMTPConnectionPool, renderer: EmailTemplateRenderer, sender: str
+    ) -> None:
+        self._pool = pool
+        self._renderer = renderer
+        self._sender = sender
+
+    async def send(
+        self,
+        template: str,
+        subject: str,
+        recipient_email: str,
+        recipient_name: str,
+        context: dict[str, Any],
+    ) -> None:
+        message = EmailMessage()
+        message["From"] = self._sender
+        message["To"] = formataddr((recipient_name, recipient_email))
+        message["Subject"] = subject
+        message.set_content(self._renderer.render(template, context), subtype="html")
+        await self._pool.send_message(message)
+
+    async def close(self) -> None:
+        await self._pool.close()
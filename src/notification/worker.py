@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import time
+from datetime import UTC, datetime, timedelta
+from typing import Callable
+
+from notification.models import EmailOutboxDTO, EmailOutboxStatsDTO
+from notification.smtp import SMTPEmailSender
+from unitofwork import IUnitOfWork
+
+logger = logging.getLogger(__name__)
+
+
+class EmailOutboxWorker:
+    """
+    Sends the emails queued in the outbox table.
+
+    A batch is claimed in one short transaction, sent concurrently over the
+    pooled SMTP connections and settled in another one. Failed emails are
+    retried with exponential backoff until max_attempts is reached. Several
+    workers can run side by side, as claimed rows are leased to one of them.
+    """
+
+    def __init__(
+        self,
+        uow_factory: Callable[[], IUnitOfWork],
+        sender: SMTPEmailSender,
+        batch_size: int,
+        poll_interval: float,
+        max_attempts: int,
+        backoff_base: int,
+        backoff_max: int,
+        lease: int,
+    ) -> None:
+        self._uow_factory = uow_factory
+        self._sender = sender
+        self._batch_size = batch_size
+        self._poll_interval = poll_interval
+        self._max_attempts = max_attempts
+        self._backoff_base = backoff_base
+        self._backoff_max = backoff_max
+        self._lease = lease
+        self._stats = EmailOutboxStatsDTO()
+
+    async def run(self) -> None:
+        while True:
+            try:
+                emails_count = await self.process_batch()
+            except Exception:
+                logger.exception("Could not process the email outbox")
+                emails_count = 0
+            if emails_count < self._batch_size:
+                await asyncio.sleep(self._poll_interval)
+
+    async def process_batch(self) -> int:
+        uow = self._uow_factory()
+        async with uow:
+            emails = await uow.email_outbox.claim_batch(self._batch_size, self._lease)
+            await uow.commit()
+        if not emails:
+            return 0
+
+        started_at = time.monotonic()
+        results = await asyncio.gather(
+            *(self._send(email) for email in emails), return_exceptions=True
+        )
+        send_time = time.monotonic() - started_at
+
+        sent_ids = []
+        retried = failed = 0
+        async with uow:
+            for email, result in zip(emails, results):
+                if not isinstance(result, Exception):
+                    sent_ids.append(email.id)
+                    continue
+                next_attempt_at = self._get_next_attempt_at(email.attempts)
+                if next_attempt_at is None:
+                    failed += 1
+                else:
+                    retried += 1
+                await uow.email_outbox.mark_failed(
+                    email.id, repr(result), next_attempt_at
+                )
+            if sent_ids:
+                await uow.email_outbox.mark_sent(sent_ids)
+            await uow.commit()
+
+        self._record_batch(len(sent_ids), retried, failed, send_time)
+        logger.info(
+            "Email batch: %d sent, %d retried, %d failed in %.3fs",
+            len(sent_ids),
+            retried,
+            failed,
+            send_time,
+        )
+        return len(emails)
+
+    def stats(self) -> EmailOutboxStatsDTO:
+        return self._stats.model_copy()
+
+    async def _send(self, email: EmailOutboxDTO) -> None:
+        await self._sender.send(
+            template=email.template,
+            subject=email.subject,
+            recipient_email=email.recipient_email,
+            recipient_name=email.recipient_name,
+            context=email.context,
+        )
+
+    def _get_next_attempt_at(self, attempts: int) -> datetime | None:
+        if attempts >= self._max_attempts:
+            return None
+        backoff = min(self._backoff_base * 2 ** (attempts - 1), self._backoff_max)
+        return datetime.now(UTC) + timedelta(seconds=backoff)
+
+    def _record_batch(
+        self, sent: int, retried: int, failed: int, send_time: float
+    ) -> None:
+        self._stats.batches += 1
+        self._stats.sent += sent
+        self._stats.retried += retried
+        self._stats.failed += failed
+        self._stats.send_time_total += send_time
+        if self._stats.send_time_total:
+            self._stats.sent_per_second = self._stats.sent / self._stats.send_time_total
+
+
+async def main() -> None:
+    from config import settings
+    from config.containers import Container
+    from stats import StatsLogger
+
+    logging.basicConfig(level=logging.INFO)
+    container = Container()
+    sender = container.email_sender()
+    worker = container.email_outbox_worker()
+    stats_logger = StatsLogger(
+        interval=settings.stats.log_interval,
+        engine=container.db_engine(),
+        components={"email_outbox": worker},
+    )
+    stats_task = asyncio.create_task(stats_logger.run())
+    try:
+        await worker.run()
+    finally:
+        stats_task.cancel()
+        await sender.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
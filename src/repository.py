@@ -4,11 +4,25 @@ from decimal import Decimal
 from typing import Any, Mapping, Sequence, Type
 from uuid import UUID
 
-from sqlalchemy import Row, delete, func, select, update
+from sqlalchemy import (
+    ColumnElement,
+    Row,
+    Select,
+    and_,
+    asc,
+    delete,
+    desc,
+    func,
+    or_,
+    select,
+    tuple_,
+    update,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute
 
 from database import Base
-from utils import Pagination
+from utils import CursorPagination, Pagination
 
 
 class IRepository(ABC):
@@ -164,3 +178,109 @@ class SQLAlchemyRepository(IRepository):
 
     async def bulk_add(self, inserts: list[dict[str, str | int | UUID | None]]) -> None:
         await self._session.execute(self.model.__table__.insert(), inserts)
+
+    async def _get_page_with_total_count(
+        self, query: Select, pagination: Pagination, count_query: Select | None = None
+    ) -> tuple[Sequence[Row], int]:
+        """
+        Fetch a page of the ordered query and its total count in one round trip.
+
+        The total comes from count(*) OVER () unless count_query is given,
+        e.g. a capped count. The page rows carry it in their last column.
+        A page past the end has no rows to carry it, so it is counted apart.
+        """
+        if count_query is None:
+            total_count = func.count().over()
+            count_query = select(func.count()).select_from(
+                query.with_only_columns(self.model.id).order_by(None).subquery()
+            )
+        else:
+            total_count = count_query.scalar_subquery()
+        query = (
+            query.add_columns(total_count.label("total_count"))
+            .offset(pagination.get_offset())
+            .limit(pagination.limit)
+        )
+        rows = (await self._session.execute(query)).unique().all()
+        if rows:
+            return rows, rows[0].total_count
+        if not pagination.get_offset():
+            return rows, 0
+        return rows, (await self._session.execute(count_query)).scalar()
+
+    def _order_by_sort_key(
+        self, query: Select, column: InstrumentedAttribute, descending: bool
+    ) -> Select:
+        """
+        Order by column with NULLs last, then by id in the same direction.
+        """
+        direction = desc if descending else asc
+        return query.order_by(direction(column).nulls_last(), direction(self.model.id))
+
+    def _paginate_by_cursor(
+        self,
+        query: Select,
+        pagination: CursorPagination,
+        column: InstrumentedAttribute,
+        descending: bool,
+    ) -> Select:
+        """
+        Order the query by the sort key and start it after the cursor row.
+
+        One extra row is fetched to tell whether there is a next page, see
+        _get_cursor_page.
+        """
+        query = self._order_by_sort_key(query, column, descending)
+        if pagination.after is not None:
+            value, id_ = self._parse_cursor(pagination, column)
+            query = query.where(
+                self._get_after_condition(column, value, id_, descending)
+            )
+        return query.limit(pagination.limit + 1)
+
+    @staticmethod
+    def _get_cursor_page(
+        pagination: CursorPagination,
+        rows: Sequence[Any],
+        column: InstrumentedAttribute,
+    ) -> tuple[Sequence[Any], str | None]:
+        if len(rows) <= pagination.limit:
+            return rows, None
+        rows = rows[: pagination.limit]
+        last = rows[-1]
+        return rows, pagination.get_next_cursor([getattr(last, column.key), last.id])
+
+    def _get_after_condition(
+        self,
+        column: InstrumentedAttribute,
+        value: Any,
+        id_: UUID,
+        descending: bool,
+    ) -> ColumnElement[bool]:
+        id_column = self.model.id
+        is_id_after = id_column < id_ if descending else id_column > id_
+        if value is None:
+            return and_(column.is_(None), is_id_after)
+        key = tuple_(column, id_column)
+        condition = key < (value, id_) if descending else key > (value, id_)
+        if self.model.__table__.c[column.key].nullable:
+            condition = or_(condition, column.is_(None))
+        return condition
+
+    @staticmethod
+    def _parse_cursor(
+        pagination: CursorPagination, column: InstrumentedAttribute
+    ) -> tuple[Any, UUID]:
+        try:
+            value, id_ = pagination.after
+            if not isinstance(id_, str):
+                raise TypeError("Cursor id must be a string")
+            if value is not None:
+                python_type = column.type.python_type
+                if python_type is datetime:
+                    value = datetime.fromisoformat(value)
+                else:
+                    value = python_type(value)
+            return value, UUID(id_)
+        except (ValueError, TypeError, AttributeError, ArithmeticError) as e:
+            raise ValueError("Invalid cursor") from e
@@ -0,0 +1,48 @@
+import asyncio
+import logging
+from typing import Protocol
+
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from database import get_pool_stats
+
+logger = logging.getLogger(__name__)
+
+
+class StatsSource(Protocol):
+    def stats(self) -> BaseModel: ...
+
+
+class StatsLogger:
+    """
+    Logs the connection pool stats and the stats of the given components every
+    interval seconds, or never if interval is not positive. Components that are
+    turned off are passed as None and skipped.
+    """
+
+    def __init__(
+        self,
+        interval: float,
+        engine: AsyncEngine,
+        components: dict[str, StatsSource | None],
+    ) -> None:
+        self._interval = interval
+        self._engine = engine
+        self._components = components
+
+    async def run(self) -> None:
+        if self._interval <= 0:
+            return
+        while True:
+            await asyncio.sleep(self._interval)
+            try:
+                self.log()
+            except Exception:
+                logger.exception("Could not log the stats")
+
+    def log(self) -> None:
+        logger.info("db_pool stats: %s", get_pool_stats(self._engine).model_dump_json())
+        for name, component in self._components.items():
+            if component is not None:
+                logger.info("%s stats: %s", name, component.stats().model_dump_json())
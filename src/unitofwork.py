@@ -1,17 +1,23 @@
 from abc import ABC, abstractmethod
+from contextvars import ContextVar, Token
 
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 
 from app.repositories import AppRepository
 from auth.repositories import UserRepository
 from calorie.repositories import DayProductRepository, DayRepository, ProductRepository
-from notification.repositories import VerificationCodeRepository
+from models import UnitOfWorkStatsDTO
+from notification.repositories import (
+    EmailOutboxRepository,
+    VerificationCodeRepository,
+)
 
 
 class IUnitOfWork(ABC):
     users: UserRepository
     verification_codes: VerificationCodeRepository
+    email_outbox: EmailOutboxRepository
     apps: AppRepository
     days: DayRepository
     products: ProductRepository
@@ -38,14 +44,99 @@ class IUnitOfWork(ABC):
         raise NotImplementedError
 
 
+class UnitOfWorkScope:
+    """
+    Request scope for units of work.
+
+    Counts sessions opened within the scope. When shared, the units of work
+    entered within the scope reuse one session bound to a single connection,
+    which is released when the scope is closed or by release(). A session is
+    not safe for concurrent use, so the shared one serves one unit at a time:
+    a unit entered while it is taken, e.g. from a gathered task, gets a
+    session of its own. Sessions cannot be taken from a closed scope.
+    """
+
+    def __init__(
+        self,
+        async_session_maker: sessionmaker[AsyncSession],
+        engine: AsyncEngine,
+        shared: bool = False,
+    ):
+        self.session_factory = async_session_maker
+        self.shared = shared
+        self.stats = UnitOfWorkStatsDTO()
+        self._engine = engine
+        self._connection: AsyncConnection | None = None
+        self._session: AsyncSession | None = None
+        self._is_session_taken = False
+        self._token: Token | None = None
+        self._is_closed = False
+
+    async def __aenter__(self):
+        self._token = _current_scope.set(self)
+        return self
+
+    async def __aexit__(self, *args):
+        _current_scope.reset(self._token)
+        self._is_closed = True
+        await self.release()
+
+    async def release(self) -> None:
+        """
+        Release the shared connection; later units get a session of their own.
+        """
+        self.shared = False
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+        self._is_session_taken = False
+
+    async def get_session(self) -> AsyncSession:
+        if self._is_closed:
+            raise RuntimeError("The unit of work scope is closed")
+        if not self.shared or self._is_session_taken:
+            self.stats.sessions_opened += 1
+            return self.session_factory()
+        if self._session is None:
+            self._connection = await self._engine.connect()
+            self._session = self.session_factory(bind=self._connection)
+            self.stats.sessions_opened += 1
+        self._is_session_taken = True
+        return self._session
+
+    async def return_session(self, session: AsyncSession) -> None:
+        """
+        Hand back a session taken by get_session once its unit is done.
+        """
+        if session is self._session:
+            session.expunge_all()
+            self._is_session_taken = False
+        else:
+            await session.close()
+
+
+_current_scope: ContextVar[UnitOfWorkScope | None] = ContextVar(
+    "current_uow_scope", default=None
+)
+
+
 class UnitOfWork(IUnitOfWork):
     def __init__(self, async_session_maker: sessionmaker[AsyncSession]):
         self.session_factory = async_session_maker
 
     async def __aenter__(self):
-        self._session = self.session_factory()
+        self._scope = _current_scope.get()
+        if self._scope is None:
+            self._session = self.session_factory()
+        else:
+            self._session = await self._scope.get_session()
+            self._scope.stats.units_entered += 1
         self.users = UserRepository(self._session)
         self.verification_codes = VerificationCodeRepository(self._session)
+        self.email_outbox = EmailOutboxRepository(self._session)
         self.apps = AppRepository(self._session)
         self.days = DayRepository(self._session)
         self.products = ProductRepository(self._session)
@@ -53,7 +144,10 @@ class UnitOfWork(IUnitOfWork):
 
     async def __aexit__(self, *args):
         await self.rollback()
-        await self._session.close()
+        if self._scope is not None:
+            await self._scope.return_session(self._session)
+        else:
+            await self._session.close()
 
     async def commit(self) -> None:
         await self._session.commit()
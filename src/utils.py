@@ -1,9 +1,24 @@
+import asyncio
+import base64
+import binascii
+import json
 from datetime import date, datetime, timedelta
-from typing import Sequence
+from typing import Any, AsyncIterator, Sequence, TypeVar
 from zoneinfo import ZoneInfo
 
+import msgpack
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+
 from config import settings
 
+T = TypeVar("T")
+
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+JSON_MEDIA_TYPE = "application/json"
+WILDCARD_MEDIA_RANGES = ("application/*", "*/*")
+
 
 class PydanticConvertor:
     """
@@ -66,6 +81,43 @@ class Pagination:
         return (self._page - 1) * self.limit
 
 
+class CursorPagination:
+    """
+    Keyset pagination with opaque cursors.
+
+    A cursor holds the sort key and id of the last row of a page, so the next
+    page starts right after that row instead of skipping rows with OFFSET.
+    Cursors are bound to the order they were created for. An empty cursor
+    starts from the first row.
+    """
+
+    def __init__(self, cursor: str = "", order: str = "", limit: int = 10) -> None:
+        self.limit = limit
+        self._order = order
+        self.after: list | None = self._decode(cursor) if cursor else None
+
+    def get_next_cursor(self, after: list) -> str:
+        payload = json.dumps({"o": self._order, "a": after}, default=str)
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    def _decode(self, cursor: str) -> list:
+        try:
+            padding = "=" * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(cursor + padding))
+            order, after = payload["o"], payload["a"]
+        except (
+            binascii.Error,
+            UnicodeDecodeError,
+            ValueError,
+            TypeError,
+            KeyError,
+        ) as e:
+            raise ValueError("Invalid cursor") from e
+        if order != self._order or not isinstance(after, list):
+            raise ValueError("Invalid cursor")
+        return after
+
+
 def this_month_range(tz: str = settings.tz.local) -> tuple[date, date]:
     today = datetime.now(ZoneInfo(tz)).date()
     start = today.replace(day=1)
@@ -75,3 +127,100 @@ def this_month_range(tz: str = settings.tz.local) -> tuple[date, date]:
         next_month = date(start.year, start.month + 1, 1)
     end = next_month - timedelta(days=1)
     return start, end
+
+
+def to_sse_event(event: BaseModel) -> str:
+    """
+    Format an event DTO with "event" and "data" fields as a Server-Sent Event.
+    """
+    data = json.dumps(event.model_dump(mode="json")["data"])
+    return f"event: {event.event}\ndata: {data}\n\n"
+
+
+class MessagePackResponse(Response):
+    media_type = MSGPACK_MEDIA_TYPES[0]
+
+    def render(self, content: Any) -> bytes:
+        return msgpack.packb(content)
+
+
+def is_msgpack_preferred(accept: str) -> bool:
+    """
+    Tell whether an Accept header ranks MessagePack above JSON.
+
+    MessagePack has to be named explicitly; it then wins over wildcard ranges
+    with the same quality, but not over application/json.
+    """
+    msgpack_q = json_q = wildcard_q = 0.0
+    for media_range in accept.split(","):
+        media_type, *params = (part.strip() for part in media_range.split(";"))
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if media_type in MSGPACK_MEDIA_TYPES:
+            msgpack_q = max(msgpack_q, q)
+        elif media_type == JSON_MEDIA_TYPE:
+            json_q = max(json_q, q)
+        elif media_type in WILDCARD_MEDIA_RANGES:
+            wildcard_q = max(wildcard_q, q)
+    return msgpack_q > json_q and msgpack_q >= wildcard_q
+
+
+def negotiate_response(request: Request, content: Any) -> Response:
+    """
+    Encode content as MessagePack when the client asks for it, as JSON otherwise.
+    """
+    if isinstance(content, BaseModel):
+        content = content.model_dump(mode="json")
+    if is_msgpack_preferred(request.headers.get("accept", "")):
+        return MessagePackResponse(content, headers={"Vary": "Accept"})
+    return JSONResponse(content, headers={"Vary": "Accept"})
+
+
+async def merge_async_iterators_in_batches(
+    *iterators: AsyncIterator[T],
+) -> AsyncIterator[list[T]]:
+    """
+    Yield values from several async iterators as soon as any of them produces one.
+
+    Values produced while the consumer was busy with the previous batch are
+    yielded together, so a slow consumer handles them in one go.
+    """
+    queue: asyncio.Queue[tuple[T | None, BaseException | None, bool]] = asyncio.Queue()
+
+    async def drain(iterator: AsyncIterator[T]) -> None:
+        try:
+            async for value in iterator:
+                await queue.put((value, None, False))
+        except Exception as e:
+            await queue.put((None, e, True))
+        else:
+            await queue.put((None, None, True))
+
+    tasks = [asyncio.create_task(drain(iterator)) for iterator in iterators]
+    try:
+        running = len(tasks)
+        while running:
+            batch = []
+            message = await queue.get()
+            while True:
+                value, error, is_finished = message
+                if error is not None:
+                    raise error
+                if is_finished:
+                    running -= 1
+                else:
+                    batch.append(value)
+                if queue.empty():
+                    break
+                message = queue.get_nowait()
+            if batch:
+                yield batch
+    finally:
+        for task in tasks:
+            task.cancel()